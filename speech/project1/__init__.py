@@ -8,6 +8,8 @@ RESOLUTION_FORMAT = paInt16
 """Bit resolution per frame."""
 N_CHANNEL = 1
 """Number of audio channels."""
+SIZEOF_FRAME = 2
+"""Size of each frame in bytes."""
 SAMPLING_RATE = 16000
 """Audio sampling rate in frames per second."""
 CHUNK_MS = 20
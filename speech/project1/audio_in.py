@@ -1,7 +1,12 @@
-from queue import Queue
-from typing import Mapping
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from queue import Full
+from threading import Event, Thread
+from typing import Iterator, Mapping
 
-from pyaudio import PyAudio, paContinue
+import numpy as np
+from pyaudio import PyAudio, paContinue, paInputOverflow
 
 from speech.project1 import (
     CHUNK_MS,
@@ -9,16 +14,69 @@ from speech.project1 import (
     N_CHANNEL,
     RESOLUTION_FORMAT,
     SAMPLING_RATE,
+    SIZEOF_FRAME,
+    open_wave_file,
 )
+from speech.project1.bounded_queue import DEFAULT_QUEUE_SIZE, BoundedQueue, QueuePolicy
+from speech.project1.stats import DEPTH_BOUNDS, Histogram
 
 N_FRAME_PER_CHUNK = SAMPLING_RATE * CHUNK_MS // MS_IN_SECOND
 """Number of frames per audio sample chunk."""
 
 
-class AudioIn:
-    def __init__(self):
+@dataclass
+class AudioInStats:
+    n_chunk: int = 0
+    n_dropped: int = 0
+    """Number of chunks after which input overflowed and audio was lost."""
+    n_late: int = 0
+    """Number of chunks sent more than a chunk later than in real time."""
+    queue_depth: Histogram = field(default_factory=lambda: Histogram(DEPTH_BOUNDS))
+    """Depth of `audio_queue` when each chunk is sent."""
+
+    def summary(self) -> dict:
+        return {
+            "n_chunk": self.n_chunk,
+            "n_dropped": self.n_dropped,
+            "n_late": self.n_late,
+            "queue_depth": self.queue_depth.summary(),
+        }
+
+
+class AudioSource(ABC):
+    """Audio input that sends `(data, n_frame, arrival_time)` chunks of 16-bit
+    mono audio at `SAMPLING_RATE` to `self.audio_queue`, recording
+    `self.stats`. `arrival_time` is the `perf_counter` time the chunk arrived
+    from the source. `self.audio_queue` is bounded, so a slow consumer cannot
+    make it grow without limit."""
+
+    audio_queue: BoundedQueue[tuple[bytes, int, float]]
+    stats: AudioInStats
+
+    def discard_first_at_least(self, n_discard=5):
+        """Discard first `n_discard` samples in `self.audio_queue` to avoid
+        initial unstable samples. Then, discard all previous samples."""
+        if self.audio_queue.qsize() < n_discard:
+            for _ in range(n_discard):
+                self.audio_queue.get(timeout=0.1)
+        with self.audio_queue.mutex:
+            self.audio_queue.queue.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+class AudioIn(AudioSource):
+    """Microphone input. The stream callback must not block, so when
+    `queue_size` chunks are queued, the oldest chunk is dropped."""
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
         self.py_audio = PyAudio()
-        self.audio_queue: Queue[tuple[bytes, int]] = Queue()
+        self.audio_queue = BoundedQueue(queue_size, QueuePolicy.DROP)
+        self.stats = AudioInStats()
         self.stream = self.py_audio.open(
             format=RESOLUTION_FORMAT,
             channels=N_CHANNEL,
@@ -33,26 +91,154 @@ class AudioIn:
         in_data: bytes | None,
         n_frame: int,
         time_info: Mapping[str, float],  # pyright: ignore reportUnusedVariable
-        status: int,  # pyright: ignore reportUnusedVariable
+        status: int,
     ):
         """A callback for `PyAudio.open`, which sends input audio data to
         `self.audio_queue`."""
         assert in_data is not None
-        self.audio_queue.put((in_data, n_frame))
+        self.stats.n_chunk += 1
+        if status & paInputOverflow:
+            self.stats.n_dropped += 1
+        self.stats.queue_depth.record(self.audio_queue.qsize())
+        self.audio_queue.put((in_data, n_frame, time.perf_counter()))
         return None, paContinue
 
-    def discard_first_at_least(self, n_discard=5):
-        """Discard first `n_discard` samples in `self.audio_queue` to avoid
-        initial unstable samples. Then, discard all previous samples."""
-        if self.audio_queue.qsize() < n_discard:
-            for _ in range(n_discard):
-                self.audio_queue.get(timeout=0.1)
-        with self.audio_queue.mutex:
-            self.audio_queue.queue.clear()
-
-    def __enter__(self):
-        return self
-
     def __exit__(self, *_):
         self.stream.close()
         self.py_audio.terminate()
+
+
+class GeneratedAudioIn(AudioSource):
+    """Audio source that sends the chunks from `self.chunks` to
+    `self.audio_queue` in a background thread, paced as if recorded live if
+    `realtime`, otherwise as fast as possible.
+    Sending waits while `queue_size` chunks are queued, so nothing is lost.
+    `self.finished` is set once all chunks are sent."""
+
+    def __init__(self, realtime=True, queue_size=DEFAULT_QUEUE_SIZE):
+        self.audio_queue = BoundedQueue(queue_size)
+        self.stats = AudioInStats()
+        self.realtime = realtime
+        self.n_frame_sent = 0
+        self.finished = Event()
+        self.stopping = Event()
+        self.thread = Thread(target=self.send_all, args=(), daemon=True)
+        self.thread.start()
+
+    @abstractmethod
+    def chunks(self) -> Iterator[bytes]:
+        """Chunks of audio data to send, each of `N_FRAME_PER_CHUNK` frames
+        except maybe the last."""
+
+    def send_all(self):
+        next_send_time = time.monotonic()
+        try:
+            for data in self.chunks():
+                if self.stopping.is_set():
+                    break
+                n_frame = len(data) // SIZEOF_FRAME
+                if self.realtime:
+                    next_send_time += n_frame / SAMPLING_RATE
+                    wait_time = next_send_time - time.monotonic()
+                    if wait_time < -CHUNK_MS / MS_IN_SECOND:
+                        self.stats.n_late += 1
+                    time.sleep(max(wait_time, 0.0))
+                self.stats.n_chunk += 1
+                self.stats.queue_depth.record(self.audio_queue.qsize())
+                if not self.put((data, n_frame, time.perf_counter())):
+                    break
+                self.n_frame_sent += n_frame
+        finally:
+            self.finished.set()
+
+    def put(self, chunk: tuple[bytes, int, float]) -> bool:
+        """Put `chunk` into `self.audio_queue`, waiting for room until
+        stopping. Return whether it was put."""
+        while not self.stopping.is_set():
+            try:
+                self.audio_queue.put(chunk, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def discard_first_at_least(self, n_discard=5):
+        """Generated audio has no unstable samples, so nothing is discarded."""
+
+    def __exit__(self, *_):
+        self.stopping.set()
+        self.thread.join(timeout=0.1)
+
+
+class WaveFileAudioIn(GeneratedAudioIn):
+    """Replay 16-bit mono WAV files `file_names` one after another."""
+
+    def __init__(self, *file_names: str, realtime=True, queue_size=DEFAULT_QUEUE_SIZE):
+        self.file_names = file_names
+        super().__init__(realtime, queue_size)
+
+    def chunks(self) -> Iterator[bytes]:
+        for file_name in self.file_names:
+            with open_wave_file(file_name, "rb") as wave_file:
+                while data := wave_file.readframes(N_FRAME_PER_CHUNK):
+                    yield data
+
+
+class LoopingAudioIn(WaveFileAudioIn):
+    """Replay 16-bit mono WAV files `file_names` in a loop for `n_loop` times,
+    or forever if `n_loop` is `None`."""
+
+    def __init__(
+        self,
+        *file_names: str,
+        n_loop: int | None = None,
+        realtime=True,
+        queue_size=DEFAULT_QUEUE_SIZE,
+    ):
+        self.n_loop = n_loop
+        super().__init__(*file_names, realtime=realtime, queue_size=queue_size)
+
+    def chunks(self) -> Iterator[bytes]:
+        n_done = 0
+        while self.n_loop is None or n_done < self.n_loop:
+            yield from super().chunks()
+            n_done += 1
+
+
+class SyntheticAudioIn(GeneratedAudioIn):
+    """Generate Gaussian noise of `noise_amplitude` standard deviation, with
+    `tone_hz` Hz tone bursts of `tone_amplitude` lasting `burst_ms` ms every
+    `period_ms` ms, for `duration_ms` ms or forever if `None`."""
+
+    def __init__(
+        self,
+        duration_ms: int | None = None,
+        noise_amplitude=100.0,
+        tone_hz=440.0,
+        tone_amplitude=8000.0,
+        burst_ms=600,
+        period_ms=1600,
+        seed=0,
+        realtime=True,
+        queue_size=DEFAULT_QUEUE_SIZE,
+    ):
+        self.duration_ms = duration_ms
+        self.noise_amplitude = noise_amplitude
+        self.tone_hz = tone_hz
+        self.tone_amplitude = tone_amplitude
+        self.burst_ms = burst_ms
+        self.period_ms = period_ms
+        self.rng = np.random.default_rng(seed)
+        super().__init__(realtime, queue_size)
+
+    def chunks(self) -> Iterator[bytes]:
+        frame_times = np.arange(N_FRAME_PER_CHUNK) / SAMPLING_RATE
+        phases = 2 * np.pi * self.tone_hz * frame_times
+        elapsed_ms = 0
+        while self.duration_ms is None or elapsed_ms < self.duration_ms:
+            chunk = self.rng.normal(0.0, self.noise_amplitude, N_FRAME_PER_CHUNK)
+            if elapsed_ms % self.period_ms < self.burst_ms:
+                start_phase = 2 * np.pi * self.tone_hz * elapsed_ms / MS_IN_SECOND
+                chunk += self.tone_amplitude * np.sin(phases + start_phase)
+            yield np.clip(chunk, -32768, 32767).astype(np.int16).tobytes()
+            elapsed_ms += CHUNK_MS
@@ -0,0 +1,113 @@
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from queue import Queue
+from time import monotonic
+from typing import Callable, Generic
+
+from speech import T
+from speech.project1.stats import DEPTH_BOUNDS, LATENCY_BOUNDS, Histogram
+
+DEFAULT_QUEUE_SIZE = 250
+"""Default maximum number of items in a queue, 5 seconds of audio chunks."""
+
+
+class QueuePolicy(Enum):
+    """What `BoundedQueue.put` does when the queue is full."""
+
+    BLOCK = "block"
+    """Wait until the consumer makes room."""
+    DROP = "drop"
+    """Drop the oldest item to make room."""
+    COALESCE = "coalesce"
+    """Merge the new item into the newest queued item."""
+
+
+@dataclass
+class QueueStats:
+    n_put: int = 0
+    """Number of items queued, excluding those coalesced."""
+    n_blocked: int = 0
+    """Number of puts that found the queue full and waited for room."""
+    n_dropped: int = 0
+    n_coalesced: int = 0
+    depth: Histogram = field(default_factory=lambda: Histogram(DEPTH_BOUNDS))
+    """Depth of the queue when each item is put."""
+    lag_seconds: Histogram = field(default_factory=lambda: Histogram(LATENCY_BOUNDS))
+    """Time each item spent in the queue before the consumer got it."""
+
+    def summary(self) -> dict:
+        return {
+            "n_put": self.n_put,
+            "n_blocked": self.n_blocked,
+            "n_dropped": self.n_dropped,
+            "n_coalesced": self.n_coalesced,
+            "depth": self.depth.summary(),
+            "lag_seconds": self.lag_seconds.summary(),
+        }
+
+
+class BoundedQueue(Queue, Generic[T]):
+    """Queue of at most `maxsize` items that applies `policy` when full,
+    recording `self.stats`. `COALESCE` merges items with `coalesce(old, new)`.
+    `None` is the end-of-stream sentinel and is always put without being
+    dropped or coalesced."""
+
+    def __init__(
+        self,
+        maxsize=DEFAULT_QUEUE_SIZE,
+        policy=QueuePolicy.BLOCK,
+        coalesce: Callable[[T, T], T] | None = None,
+    ):
+        assert maxsize > 0, "A bounded queue needs a positive `maxsize`."
+        assert (
+            policy != QueuePolicy.COALESCE or coalesce is not None
+        ), "`COALESCE` needs a `coalesce` function."
+        super().__init__(maxsize)
+        self.policy = policy
+        self.coalesce = coalesce
+        self.stats = QueueStats()
+
+    def _init(self, maxsize: int):
+        self.queue: deque[tuple[float, T | None]] = deque()
+
+    def _put(self, item: T | None):
+        self.stats.n_put += 1
+        self.stats.depth.record(self._qsize())
+        self.queue.append((monotonic(), item))
+
+    def _get(self) -> T | None:
+        put_time, item = self.queue.popleft()
+        self.stats.lag_seconds.record(monotonic() - put_time)
+        return item
+
+    def put(self, item: T | None, block=True, timeout: float | None = None):
+        if self.policy == QueuePolicy.BLOCK and item is not None:
+            if self.full():
+                self.stats.n_blocked += 1
+            return super().put(item, block, timeout)
+        with self.not_full:
+            if item is not None and self._qsize() >= self.maxsize:
+                if self.policy == QueuePolicy.DROP:
+                    self.queue.popleft()
+                    self.unfinished_tasks -= 1
+                    self.stats.n_dropped += 1
+                elif (last := self.queue[-1][1]) is not None:
+                    assert self.coalesce is not None
+                    self.queue[-1] = (self.queue[-1][0], self.coalesce(last, item))
+                    self.stats.n_coalesced += 1
+                    return
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+def keep_last_bytes(size: int) -> Callable[[bytes, bytes], bytes]:
+    """Coalesce function that concatenates bytes but keeps only the last
+    `size` bytes, aligned to whole 16-bit samples."""
+    size -= size % 2
+
+    def coalesce(old: bytes, new: bytes) -> bytes:
+        return (old + new)[-size:]
+
+    return coalesce
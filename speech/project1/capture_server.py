@@ -0,0 +1,221 @@
+"""Capture service that endpoints many concurrent audio streams in one event loop.
+Each stream is 16-bit mono PCM at `SAMPLING_RATE`, sent over a local socket or
+put into an in-process queue.
+Run with `python3 -m speech.project1.capture_server WAV_FILE...` to replay
+WAV files as concurrent streams to a running server."""
+
+import argparse
+import asyncio
+from abc import ABC, abstractmethod
+from logging import exception
+from typing import AsyncIterator, Callable, Generic
+
+import numpy as np
+from numpy.typing import NDArray
+
+from speech import T
+from speech.project1 import CHUNK_MS, MS_IN_SECOND, SIZEOF_FRAME, open_wave_file
+from speech.project1.audio_in import N_FRAME_PER_CHUNK
+from speech.project1.endpoint import (
+    EndpointerStats,
+    EndpointState,
+    get_classify_sample,
+)
+from speech.project1.stats import log_periodically
+
+SIZE_OF_CHUNK = N_FRAME_PER_CHUNK * SIZEOF_FRAME
+"""Size of each audio sample chunk in bytes."""
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8304
+
+
+class SpeechConsumer(ABC, Generic[T]):
+    """Consumes the endpointed speech of one stream."""
+
+    @abstractmethod
+    def add_sample(self, audio_array: NDArray[np.int16]):
+        """Receive the next piece of speech."""
+
+    @abstractmethod
+    def finish(self) -> T:
+        """Called once speech stops. Return the result sent back to the
+        stream. Run in an executor, so it may be CPU-bound."""
+
+
+class AudioConsumer(SpeechConsumer[T]):
+    """Collect all speech of a stream and pass it to `recognize` once speech
+    stops."""
+
+    def __init__(self, recognize: Callable[[NDArray[np.int16]], T]):
+        self.recognize = recognize
+        self.audio_arrays: list[NDArray[np.int16]] = []
+
+    def add_sample(self, audio_array: NDArray[np.int16]):
+        self.audio_arrays.append(audio_array)
+
+    def finish(self) -> T:
+        if len(self.audio_arrays) == 0:
+            return self.recognize(np.array([], dtype=np.int16))
+        return self.recognize(np.concatenate(self.audio_arrays))
+
+
+class CaptureServer(Generic[T]):
+    """Endpoint concurrent audio streams, each classified by the classifier
+    `new_classify_sample` creates, and feeding the consumer `new_consumer`
+    creates for it given the stream ID.
+    Statistics of all streams are recorded into `self.stats`."""
+
+    def __init__(
+        self,
+        new_consumer: Callable[[str], SpeechConsumer[T]],
+        new_classify_sample: Callable[
+            [], Callable[[NDArray[np.int16]], bool]
+        ] = get_classify_sample,
+    ):
+        self.new_consumer = new_consumer
+        self.new_classify_sample = new_classify_sample
+        self.n_stream = 0
+        self.stats = EndpointerStats()
+
+    async def serve_chunks(self, stream_id: str, chunks: AsyncIterator[bytes]) -> T:
+        """Endpoint audio `chunks` until speech stops or `chunks` ends, and
+        return the consumer's result."""
+        consumer = self.new_consumer(stream_id)
+        state = EndpointState(self.new_classify_sample(), self.stats)
+        async for data in chunks:
+            for speech in state.feed(data):
+                consumer.add_sample(np.frombuffer(speech, dtype=np.int16))
+            if state.stopped:
+                break
+        return await asyncio.get_running_loop().run_in_executor(None, consumer.finish)
+
+    async def serve_queue(
+        self, stream_id: str, queue: asyncio.Queue[bytes | None]
+    ) -> T:
+        """Serve a stream whose chunks are put into `queue`, ended by `None`."""
+        return await self.serve_chunks(stream_id, queue_chunks(queue))
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """Serve the audio stream sent over a connection, and reply with the
+        result on one line."""
+        self.n_stream += 1
+        stream_id = f"{writer.get_extra_info('peername')}#{self.n_stream}"
+        try:
+            try:
+                result = await self.serve_chunks(stream_id, reader_chunks(reader))
+            except Exception as err:
+                exception(f"Failed to serve stream {stream_id}.")
+                result = f"Error: {err!r}"
+            writer.write(f"{result}\n".encode())
+            await writer.drain()
+            # Discard audio sent after speech stops until the client hangs up.
+            while await reader.read(SIZE_OF_CHUNK):
+                pass
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT) -> asyncio.Server:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def start_unix(self, path: str) -> asyncio.Server:
+        return await asyncio.start_unix_server(self.handle_connection, path)
+
+
+def serve_forever(
+    new_consumer: Callable[[str], SpeechConsumer],
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    stats_interval=60.0,
+):
+    """Run a `CaptureServer` on `host`:`port` until interrupted, logging its
+    statistics every `stats_interval` seconds."""
+
+    async def run():
+        capture_server = CaptureServer(new_consumer)
+        log_periodically("Capture server", capture_server.stats.summary, stats_interval)
+        server = await capture_server.start(host, port)
+        print(f"Serving audio streams on {host}:{port}.")
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+async def queue_chunks(queue: asyncio.Queue[bytes | None]) -> AsyncIterator[bytes]:
+    while (data := await queue.get()) is not None:
+        yield data
+
+
+async def reader_chunks(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    """Split the bytes from `reader` into chunks of `SIZE_OF_CHUNK` bytes,
+    with a shorter last chunk."""
+    while True:
+        try:
+            yield await reader.readexactly(SIZE_OF_CHUNK)
+        except asyncio.IncompleteReadError as err:
+            if err.partial:
+                yield err.partial
+            return
+
+
+async def wave_file_chunks(file_name: str, realtime=False) -> AsyncIterator[bytes]:
+    """Replay WAV file `file_name` in chunks of `N_FRAME_PER_CHUNK` frames,
+    paced as if recorded live if `realtime`."""
+    with open_wave_file(file_name, "rb") as wave_file:
+        while data := wave_file.readframes(N_FRAME_PER_CHUNK):
+            yield data
+            await asyncio.sleep(CHUNK_MS / MS_IN_SECOND if realtime else 0)
+
+
+async def stream_wave_file(
+    file_name: str, host=DEFAULT_HOST, port=DEFAULT_PORT, realtime=False
+) -> str:
+    """Send WAV file `file_name` to a `CaptureServer` and return its reply."""
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def send_all():
+        async for data in wave_file_chunks(file_name, realtime):
+            writer.write(data)
+            await writer.drain()
+        writer.write_eof()
+
+    sending = asyncio.create_task(send_all())
+    try:
+        # The server may reply as soon as speech stops.
+        reply = await reader.readline()
+        if not sending.done():
+            sending.cancel()
+            writer.write_eof()
+        return reply.decode().strip()
+    finally:
+        sending.cancel()
+        writer.close()
+        await writer.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay WAV files to a server")
+    parser.add_argument("files", nargs="+", help="WAV files to stream concurrently")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Server host")
+    parser.add_argument("-p", "--port", default=DEFAULT_PORT, type=int)
+    parser.add_argument(
+        "-r", "--realtime", action="store_true", help="Pace streams in real time."
+    )
+    args = parser.parse_args()
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                stream_wave_file(file_name, args.host, args.port, args.realtime)
+                for file_name in args.files
+            )
+        )
+
+    for file_name, reply in zip(args.files, asyncio.run(run())):
+        print(f"{file_name}: {reply}")
+
+
+main() if __name__ == "__main__" else None
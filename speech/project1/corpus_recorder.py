@@ -0,0 +1,212 @@
+"""Record a whole corpus in one capture session.
+Speech is endpointed into one labeled WAV file per utterance, or noise is cut
+into fixed-length segments, written by a pool of writer threads and listed in
+a manifest of path, duration and label.
+Run with `python3 -m speech.project1.corpus_recorder LABEL...`."""
+
+import argparse
+import csv
+import os
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import astuple, dataclass, fields
+from logging import exception
+from queue import Empty
+from typing import Callable, Iterator, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from speech.project1 import (
+    MAX_PAUSE_MS,
+    MS_IN_SECOND,
+    N_CHANNEL,
+    SAMPLING_RATE,
+    SIZEOF_FRAME,
+)
+from speech.project1.audio_in import AudioIn, AudioSource, WaveFileAudioIn
+from speech.project1.endpoint import (
+    EndpointState,
+    get_classify_sample,
+    get_classify_sample_spectral,
+)
+
+MANIFEST_FILE_NAME = "manifest.csv"
+"""Name of the manifest file in the output directory."""
+N_WRITER = 4
+"""Default number of writer threads."""
+
+
+@dataclass
+class Segment:
+    path: str
+    duration: float
+    """Duration in seconds."""
+    label: str
+
+
+def speech_segments(
+    audio_in: AudioSource,
+    classify_sample: Callable[[NDArray[np.int16]], bool],
+    timeout=0.1,
+) -> Iterator[bytes]:
+    """Endpoint the audio from `audio_in` into utterances until no audio
+    arrives for `timeout` seconds. `classify_sample` is shared by all
+    utterances so its background level carries over."""
+    while True:
+        state = EndpointState(classify_sample)
+        speeches: list[bytes] = []
+        while not state.stopped:
+            try:
+                data, _, arrival_time = audio_in.audio_queue.get(timeout=timeout)
+            except Empty:
+                if speeches:
+                    yield b"".join(speeches)
+                return
+            speeches.extend(state.feed(data, arrival_time))
+        yield b"".join(speeches)
+
+
+def fixed_segments(
+    audio_in: AudioSource, segment_ms=MAX_PAUSE_MS, timeout=0.1
+) -> Iterator[bytes]:
+    """Cut the audio from `audio_in` into segments of at least `segment_ms`
+    ms until no audio arrives for `timeout` seconds, dropping the shorter
+    last segment."""
+    n_segment_frame = segment_ms * SAMPLING_RATE // MS_IN_SECOND
+    while True:
+        chunks: list[bytes] = []
+        n_frame = 0
+        while n_frame < n_segment_frame:
+            try:
+                data, n_chunk_frame, _ = audio_in.audio_queue.get(timeout=timeout)
+            except Empty:
+                return
+            chunks.append(data)
+            n_frame += n_chunk_frame
+        yield b"".join(chunks)
+
+
+def write_segment(file_name: str, data: bytes, label: str) -> Segment:
+    with open(file_name, "wb") as file, wave.open(file, "wb") as out_file:
+        out_file.setnchannels(N_CHANNEL)
+        out_file.setsampwidth(SIZEOF_FRAME)
+        out_file.setframerate(SAMPLING_RATE)
+        out_file.writeframes(data)
+    return Segment(file_name, len(data) / SIZEOF_FRAME / SAMPLING_RATE, label)
+
+
+def record_corpus(
+    segments: Iterator[bytes],
+    labels: Sequence[str],
+    out_dir="recordings",
+    n_round: int | None = None,
+    start_index=0,
+    n_writer=N_WRITER,
+) -> list[Segment]:
+    """Write each of `segments` to `out_dir`/`{label}{index}.wav`, cycling
+    through `labels` for `n_round` rounds or until `segments` ends, with
+    `index` counting rounds from `start_index`.
+    Append the written segments to the manifest in `out_dir` and return them,
+    also if interrupted. If any segment fails to be written, the others are
+    still listed in the manifest, and then the first failure is raised."""
+    os.makedirs(out_dir, exist_ok=True)
+    futures: list[Future[Segment]] = []
+    failures: list[Exception] = []
+    try:
+        with ThreadPoolExecutor(n_writer) as writers:
+            print(f"Say {labels[0]!r}.")
+            for n_done, data in enumerate(segments, start=1):
+                label = labels[(n_done - 1) % len(labels)]
+                index = start_index + (n_done - 1) // len(labels)
+                file_name = os.path.join(out_dir, f"{label}{index}.wav")
+                futures.append(writers.submit(write_segment, file_name, data, label))
+                if n_round is not None and n_done >= n_round * len(labels):
+                    break
+                print(f"Recorded {file_name}. Say {labels[n_done % len(labels)]!r}.")
+    finally:
+        written: list[Segment] = []
+        for future in futures:
+            try:
+                written.append(future.result())
+            except Exception as err:
+                exception("Failed to write a segment.")
+                failures.append(err)
+        append_manifest(os.path.join(out_dir, MANIFEST_FILE_NAME), written)
+    if failures:
+        raise failures[0]
+    return written
+
+
+def append_manifest(manifest_file_name: str, segments: list[Segment]):
+    """Append `segments` to the CSV manifest, with a header if it is new."""
+    is_new = not os.path.exists(manifest_file_name)
+    with open(manifest_file_name, "a", newline="") as manifest_file:
+        writer = csv.writer(manifest_file)
+        if is_new:
+            writer.writerow(field.name for field in fields(Segment))
+        writer.writerows(astuple(segment) for segment in segments)
+
+
+def read_manifest(manifest_file_name: str) -> list[Segment]:
+    with open(manifest_file_name, newline="") as manifest_file:
+        return [
+            Segment(row["path"], float(row["duration"]), row["label"])
+            for row in csv.DictReader(manifest_file)
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Corpus recorder")
+    parser.add_argument("labels", nargs="+", help="Labels to record in turn")
+    parser.add_argument("-o", "--output", default="recordings", help="Output dir")
+    parser.add_argument("-n", "--n-round", type=int, help="Rounds through labels")
+    parser.add_argument("-i", "--start-index", default=0, type=int)
+    parser.add_argument(
+        "-m",
+        "--fixed-ms",
+        type=int,
+        help="Cut fixed segments of this many ms instead of endpointing.",
+    )
+    parser.add_argument(
+        "-s",
+        "--spectral-vad",
+        action="store_true",
+        help="Endpoint with band energy, spectral flatness and zero crossings.",
+    )
+    parser.add_argument(
+        "-f", "--files", nargs="+", help="Segment WAV files instead of recording."
+    )
+    parser.add_argument("-w", "--n-writer", default=N_WRITER, type=int)
+    args = parser.parse_args()
+
+    new_audio_in: Callable[[], AudioSource] = (
+        (lambda: WaveFileAudioIn(*args.files, realtime=False))
+        if args.files
+        else AudioIn
+    )
+    with new_audio_in() as audio_in:
+        if not args.files:
+            input("Press Enter to start recording...")
+            audio_in.discard_first_at_least()
+        if args.fixed_ms is not None:
+            segments = fixed_segments(audio_in, args.fixed_ms)
+        else:
+            new_classify_sample = (
+                get_classify_sample_spectral
+                if args.spectral_vad
+                else get_classify_sample
+            )
+            segments = speech_segments(audio_in, new_classify_sample())
+        written = record_corpus(
+            segments,
+            args.labels,
+            args.output,
+            args.n_round,
+            args.start_index,
+            args.n_writer,
+        )
+    print(f"Wrote {len(written)} files.")
+
+
+main() if __name__ == "__main__" else None
@@ -1,73 +1,108 @@
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
 from logging import debug
-from queue import Queue
+from queue import Empty, Queue
 from threading import Thread
+from time import perf_counter
+from typing import Callable
 
 import numpy as np
 from numpy.typing import NDArray
 
-from speech.project1 import CHUNK_MS, MAX_PAUSE_MS, MS_IN_SECOND, SAMPLING_RATE
-from speech.project1.audio_in import AudioIn
+from speech.project1 import (
+    CHUNK_MS,
+    MAX_PAUSE_MS,
+    MS_IN_SECOND,
+    SAMPLING_RATE,
+    SIZEOF_FRAME,
+)
+from speech.project1.audio_in import N_FRAME_PER_CHUNK, AudioSource
+from speech.project1.stats import DEPTH_BOUNDS, LATENCY_BOUNDS, Histogram
+from speech.project2.lib import power_spectra_from_frames
 
-SIZEOF_FRAME = 2
-"""Size of each frame in bytes."""
 BACKTRACK_MS = 200
 """Duration in milliseconds to backtrack when speech starts."""
 SIZE_OF_BACKTRACK = SAMPLING_RATE * BACKTRACK_MS // MS_IN_SECOND
 """Size of the buffer in bytes for backtracking when speech starts."""
+SIZE_OF_MAX_PAUSE = SAMPLING_RATE * MAX_PAUSE_MS // MS_IN_SECOND * SIZEOF_FRAME
+"""Size in bytes of the audio received during the longest pause tolerated."""
+N_BACKTRACK_SAMPLE = SIZE_OF_BACKTRACK // SIZEOF_FRAME
+"""Number of samples backtracked when speech starts."""
+N_MAX_PAUSE_CHUNK = MAX_PAUSE_MS // CHUNK_MS
+"""Maximum number of consecutive non-speech chunks tolerated during speech."""
+LATE_QUEUE_DEPTH = 5
+"""Number of chunks queued behind a chunk for it to be considered late."""
+
+
+@dataclass
+class EndpointerStats:
+    n_chunk: int = 0
+    n_speech_chunk: int = 0
+    n_pause: int = 0
+    n_late: int = 0
+    """Number of chunks received with at least `LATE_QUEUE_DEPTH` chunks
+    queued behind them."""
+    queue_depth: Histogram = field(default_factory=lambda: Histogram(DEPTH_BOUNDS))
+    """Depth of the audio queue after receiving each chunk."""
+    classify_seconds: Histogram = field(
+        default_factory=lambda: Histogram(LATENCY_BOUNDS)
+    )
+    onset_latency_seconds: Histogram = field(
+        default_factory=lambda: Histogram(LATENCY_BOUNDS)
+    )
+    """Time from the first speech chunk arriving from the audio source to it
+    being emitted, or from it being fed if its arrival time is unknown."""
+
+    def summary(self) -> dict:
+        return {
+            "n_chunk": self.n_chunk,
+            "n_speech_chunk": self.n_speech_chunk,
+            "n_pause": self.n_pause,
+            "n_late": self.n_late,
+            "queue_depth": self.queue_depth.summary(),
+            "classify_seconds": self.classify_seconds.summary(),
+            "onset_latency_seconds": self.onset_latency_seconds.summary(),
+        }
 
 
 class Endpointer:
     """Endpoint audio received from `audio_in` and write speech data to
     `write_queue` in a background thread until speech stops.
-    Stopping condition: `MAX_PAUSE_MS` ms after speech stops."""
+    Stopping condition: `MAX_PAUSE_MS` ms after speech stops, or no audio is
+    received for `timeout` seconds."""
 
     def __init__(
-        self, audio_in: AudioIn, write_queue: Queue[bytes | None], timeout=0.1
+        self,
+        audio_in: AudioSource,
+        write_queue: Queue[bytes | None],
+        timeout=0.1,
+        classify_sample: Callable[[NDArray[np.int16]], bool] | None = None,
+        stats: EndpointerStats | None = None,
     ):
         self.audio_in = audio_in
         self.write_queue = write_queue
         self.timeout = timeout
-        self.classify_sample = get_classify_sample()
-        self.off_time = 0
-        self.started = False
-        self.paused = False
-        self.pending_samples = b""
+        self.state = EndpointState(classify_sample, stats)
+        self.stats = self.state.stats
         self.thread = Thread(target=self.write_all, args=())
         self.thread.start()
 
     def write_all(self):
         """Write all audio sample to `self.write_queue`."""
         try:
-            while True:
-                data, _ = self.audio_in.audio_queue.get(timeout=self.timeout)
-                audio_array = np.frombuffer(data, dtype=np.int16)
-                is_speech = self.classify_sample(audio_array)
-
-                if not self.started:
-                    if is_speech:
-                        self.started = True
-                        # Backtrack previous sample before recording starts.
-                        self.write_queue.put(self.pending_samples[-SIZE_OF_BACKTRACK:])
-                        self.pending_samples = b""
-                        self.write_queue.put(data)
-                    else:
-                        self.pending_samples += data
-                else:
-                    if is_speech:
-                        self.off_time = 0
-                        if self.paused:
-                            print("Writing samples received during pause.")
-                            self.paused = False
-                            # Backtrack previous sample during pause.
-                            self.write_queue.put(self.pending_samples)
-                            self.pending_samples = b""
-                        self.write_queue.put(data)
-                    else:
-                        self.paused = True
-                        self.off_time += CHUNK_MS
-                        if self.off_time > MAX_PAUSE_MS:
-                            break
-                        self.pending_samples += data
+            while not self.state.stopped:
+                data, _, arrival_time = self.audio_in.audio_queue.get(
+                    timeout=self.timeout
+                )
+                queue_depth = self.audio_in.audio_queue.qsize()
+                self.stats.queue_depth.record(queue_depth)
+                if queue_depth >= LATE_QUEUE_DEPTH:
+                    self.stats.n_late += 1
+                for speech in self.state.feed(data, arrival_time):
+                    self.write_queue.put(speech)
+        except Empty:
+            debug("No audio received in %s seconds.", self.timeout)
         finally:
             self.write_queue.put(None)
 
@@ -75,6 +110,115 @@ class Endpointer:
         self.thread.join(timeout=0)
 
 
+class EndpointState:
+    """Endpointing state of one audio stream, fed one chunk at a time.
+    Each chunk is classified by `classify_sample`, which defaults to a new
+    `get_classify_sample()`. Statistics are recorded into `stats`, which may be
+    shared between streams.
+    Stopping condition: `MAX_PAUSE_MS` ms after speech stops."""
+
+    def __init__(
+        self,
+        classify_sample: Callable[[NDArray[np.int16]], bool] | None = None,
+        stats: EndpointerStats | None = None,
+    ):
+        self.classify_sample = classify_sample or get_classify_sample()
+        self.stats = stats or EndpointerStats()
+        self.off_time = 0
+        self.started = False
+        self.paused = False
+        self.stopped = False
+        self.pending_samples = RingBuffer(max(SIZE_OF_BACKTRACK, SIZE_OF_MAX_PAUSE))
+
+    def feed(self, data: bytes, arrival_time: float | None = None) -> list[bytes]:
+        """Classify audio chunk `data`, which arrived at `perf_counter` time
+        `arrival_time` if known, and return the speech data to write, which
+        may include backtracked samples before it."""
+        start_time = perf_counter()
+        audio_array = np.frombuffer(data, dtype=np.int16)
+        is_speech = self.classify_sample(audio_array)
+        self.stats.classify_seconds.record(perf_counter() - start_time)
+        self.stats.n_chunk += 1
+        self.stats.n_speech_chunk += is_speech
+        speeches = []
+
+        if not self.started:
+            if is_speech:
+                self.started = True
+                # Backtrack previous sample before recording starts.
+                if backtrack := self.pending_samples.read(SIZE_OF_BACKTRACK):
+                    speeches.append(backtrack)
+                self.pending_samples.clear()
+                speeches.append(data)
+                self.stats.onset_latency_seconds.record(
+                    perf_counter() - (arrival_time or start_time)
+                )
+            else:
+                self.pending_samples.write(data)
+        else:
+            if is_speech:
+                self.off_time = 0
+                if self.paused:
+                    debug("Writing samples received during pause.")
+                    self.paused = False
+                    # Backtrack previous sample during pause.
+                    speeches.append(
+                        self.pending_samples.read(len(self.pending_samples))
+                    )
+                    self.pending_samples.clear()
+                speeches.append(data)
+            else:
+                self.stats.n_pause += not self.paused
+                self.paused = True
+                self.off_time += CHUNK_MS
+                if self.off_time > MAX_PAUSE_MS:
+                    self.stopped = True
+                else:
+                    self.pending_samples.write(data)
+        return speeches
+
+
+class RingBuffer:
+    """Preallocated circular byte buffer that keeps the last `capacity` bytes
+    written, so buffering audio takes constant memory and time per chunk."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = memoryview(bytearray(capacity))
+        self.end = 0
+        """Index where the next byte is written."""
+        self.size = 0
+
+    def write(self, data: bytes):
+        """Write `data`, overwriting the oldest bytes if full."""
+        view = memoryview(data).cast("B")[-self.capacity :]
+        n_first = min(len(view), self.capacity - self.end)
+        self.buffer[self.end : self.end + n_first] = view[:n_first]
+        self.buffer[: len(view) - n_first] = view[n_first:]
+        self.end = (self.end + len(view)) % self.capacity
+        self.size = min(self.size + len(view), self.capacity)
+
+    def last(self, n: int) -> list[memoryview]:
+        """Zero-copy views of the last `n` bytes written, oldest first.
+        The views are only valid until the next `write`."""
+        n = min(n, self.size)
+        start = (self.end - n) % self.capacity
+        if start + n <= self.capacity:
+            return [self.buffer[start : start + n]]
+        return [self.buffer[start:], self.buffer[: self.end]]
+
+    def read(self, n: int) -> bytes:
+        """Copy out the last `n` bytes written, oldest first, for consumers
+        that outlive the next `write`."""
+        return b"".join(self.last(n))
+
+    def clear(self):
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+
 FORGET_FACTOR = 1.2
 """Forgetting factor for updating `level` energy in `get_classify_sample`."""
 STARTING_THRESHOLD_DB = 15.0
@@ -89,19 +233,30 @@ STRONG_ADJUSTMENT = 0.8
 
 def get_classify_sample():
     """Get a closure that classifies whether each sample is speech.
+    See `get_classify_energy` for the classification criteria."""
+    classify_energy = get_classify_energy()
+
+    def classify_frame(arr: NDArray[np.int16]) -> bool:
+        return classify_energy(sample_decibel_energy(arr))
+
+    return classify_frame
+
+
+def get_classify_energy(log_debug=True):
+    """Get a closure that classifies whether each sample is speech given its
+    decibel energy, logging its state if `log_debug`.
     Speech is considered to start when the `level` energy is at least
     `STARTING_THRESHOLD_DB` higher than `background` energy;
     speech is considered to continue when the `level` energy is
     at least `CONTINUING_THRESHOLD_DB` higher than `background` energy and
     at least `STOPPING_THRESHOLD_DB` higher than `foreground` energy."""
-    level: np.float64 | None = None
-    background: np.float64 | None = None
+    level: float | None = None
+    background: float | None = None
     foreground = 0.0
     speaking = False
 
-    def classify_frame(arr: NDArray[np.int16]) -> bool:
+    def classify_energy(current: float) -> bool:
         nonlocal level, background, foreground, speaking
-        current = sample_decibel_energy(arr)
         if level is None:
             level = current
         if background is None:
@@ -109,9 +264,15 @@ def get_classify_sample():
 
         level = ((level * FORGET_FACTOR) + current) / (FORGET_FACTOR + 1.0)
 
-        debug(
-            f"speaking: {'Y' if speaking else 'N'}, current: {current:.1f}, bg: {background:.1f}, fg: {foreground:.1f}, level: {level:.1f}."
-        )
+        if log_debug:
+            debug(
+                "speaking: %s, current: %.1f, bg: %.1f, fg: %.1f, level: %.1f.",
+                "Y" if speaking else "N",
+                current,
+                background,
+                foreground,
+                level,
+            )
 
         if speaking:
             if (
@@ -135,9 +296,124 @@ def get_classify_sample():
 
         return speaking
 
+    return classify_energy
+
+
+SPEECH_BAND_HZ = (300.0, 3400.0)
+"""Frequency band in Hz whose energy `get_classify_spectrum` tracks."""
+MAX_SPEECH_FLATNESS = 0.35
+"""Maximum spectral flatness in the speech band for a chunk to be speech-like.
+Fans, hiss and clicks have flat spectra close to 1; voiced speech is peaky."""
+MAX_SPEECH_ZERO_CROSSING_RATE = 0.4
+"""Maximum zero crossings per sample for a chunk to be speech-like."""
+NOISE_PENALTY_DB = 20.0
+"""Decibels subtracted from the energy of chunks that are not speech-like."""
+
+
+def get_classify_sample_spectral():
+    """Get a closure that classifies whether each sample is speech using its
+    band-limited energy, spectral flatness and zero-crossing rate.
+    See `get_classify_spectrum`. The power spectrum is computed by the MFCC
+    front end's `power_spectra_from_frames`."""
+    classify_spectrum = get_classify_spectrum()
+
+    def classify_frame(arr: NDArray[np.int16]) -> bool:
+        fft_size, powers = power_spectra_from_frames(arr[np.newaxis], np.float64)
+        return classify_spectrum(powers[0], fft_size, zero_crossing_rate(arr))
+
     return classify_frame
 
 
+def get_classify_spectrum():
+    """Get a closure that classifies whether each sample is speech given its
+    power spectrum from a `fft_size`-point FFT and its zero-crossing rate,
+    so a front end that already has the power spectrum can reuse it.
+    Chunks whose speech band is too flat or that cross zero too often are
+    not speech-like, and their band energy is lowered by `NOISE_PENALTY_DB`
+    before being classified like in `get_classify_energy`, so they neither
+    start nor sustain speech."""
+    classify_energy = get_classify_energy()
+
+    def classify_spectrum(
+        powers: NDArray[np.float64], fft_size: int, zero_crossing_rate: float
+    ) -> bool:
+        band = powers[speech_band_slice(fft_size)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_power = np.mean(band)
+            band_energy = float(np.log10(mean_power) * 10.0)
+            flatness = np.exp(np.mean(np.log(band))) / mean_power
+        speech_like = (
+            flatness <= MAX_SPEECH_FLATNESS
+            and zero_crossing_rate <= MAX_SPEECH_ZERO_CROSSING_RATE
+        )
+        return classify_energy(
+            band_energy if speech_like else band_energy - NOISE_PENALTY_DB
+        )
+
+    return classify_spectrum
+
+
+@lru_cache(maxsize=8)
+def speech_band_slice(fft_size: int) -> slice:
+    """Slice of the `fft_size`-point FFT power spectrum in `SPEECH_BAND_HZ`."""
+    low, high = SPEECH_BAND_HZ
+    return slice(
+        math.ceil(low * fft_size / SAMPLING_RATE),
+        math.floor(high * fft_size / SAMPLING_RATE) + 1,
+    )
+
+
+def zero_crossing_rate(arr: NDArray[np.int16]) -> float:
+    """Number of sign changes per sample in `arr`."""
+    if len(arr) < 2:
+        return 0.0
+    return np.count_nonzero(np.diff(np.signbit(arr))) / (len(arr) - 1)
+
+
+def endpoint_samples(
+    arr: NDArray[np.int16], chunk_size=N_FRAME_PER_CHUNK
+) -> tuple[NDArray[np.bool_], int, int]:
+    """Endpoint a whole recording `arr` in one pass.
+    Return whether each `chunk_size`-sample chunk is speech, and the start and
+    end sample indexes of the speech `Endpointer` would write, which is an
+    empty range if no speech is found."""
+    energies = chunk_decibel_energies(arr, chunk_size)
+    classify_energy = get_classify_energy(log_debug=False)
+    is_speech = np.empty(energies.size, dtype=np.bool_)
+    for index, energy in enumerate(energies.tolist()):
+        is_speech[index] = classify_energy(energy)
+
+    speech_chunks = np.flatnonzero(is_speech)
+    if speech_chunks.size == 0:
+        return is_speech, 0, 0
+    # Speech stops at the first pause longer than `MAX_PAUSE_MS`.
+    long_pauses = np.flatnonzero(np.diff(speech_chunks) > N_MAX_PAUSE_CHUNK + 1)
+    last_chunk = speech_chunks[long_pauses[0] if long_pauses.size else -1]
+    start = max(int(speech_chunks[0]) * chunk_size - N_BACKTRACK_SAMPLE, 0)
+    end = min((int(last_chunk) + 1) * chunk_size, arr.size)
+    return is_speech, start, end
+
+
+def chunk_decibel_energies(
+    arr: NDArray[np.int16], chunk_size=N_FRAME_PER_CHUNK
+) -> NDArray[np.float64]:
+    """Calculate the decibel energy of each `chunk_size`-sample chunk of `arr`,
+    including the shorter last chunk if `arr` does not split evenly."""
+    n_full_chunk = arr.size // chunk_size
+    full_chunks = (
+        arr[: n_full_chunk * chunk_size]
+        .reshape(n_full_chunk, chunk_size)
+        .astype(np.float64)  # avoid overflow
+    )
+    powers = np.einsum("ij,ij->i", full_chunks, full_chunks) / chunk_size
+    with np.errstate(divide="ignore"):
+        energies = np.log10(powers) * 10.0
+    if arr.size > n_full_chunk * chunk_size:
+        last_energy = sample_decibel_energy(arr[n_full_chunk * chunk_size :])
+        energies = np.append(energies, last_energy)
+    return energies
+
+
 def sample_decibel_energy(arr: NDArray[np.int16]) -> np.float64:
     """Calculate the energy of an audio sample in decibel."""
     arr = arr.astype(np.int64)  # avoid overflow
@@ -4,42 +4,93 @@ import argparse
 import wave
 from queue import Queue
 from threading import Thread
+from typing import Callable
 
 import matplotlib.pyplot as plt
 import numpy as np
-
-from speech.project1 import N_CHANNEL, RESOLUTION_FORMAT, SAMPLING_RATE
-from speech.project1.audio_in import AudioIn
-from speech.project1.endpoint import Endpointer
-
-
-def audio_recording_thread(byte_queue: Queue[bytes | None], out_file_name: str):
-    """Endpoint speech and record into `out_file_name`."""
-    write_queue: Queue[bytes | None] = Queue()
-    overlay_queue: Queue[bytes | None] = Queue()
-
-    with wave.open(out_file_name, "wb") as out_file, AudioIn() as audio_in:
+from numpy.typing import NDArray
+
+from speech.project1 import N_CHANNEL, SAMPLING_RATE, SIZEOF_FRAME
+from speech.project1.audio_in import AudioIn, AudioSource
+from speech.project1.bounded_queue import (
+    DEFAULT_QUEUE_SIZE,
+    BoundedQueue,
+    QueuePolicy,
+    keep_last_bytes,
+)
+from speech.project1.endpoint import (
+    Endpointer,
+    get_classify_sample,
+    get_classify_sample_spectral,
+)
+from speech.project1.stats import log_periodically
+
+
+def audio_recording_thread(
+    byte_queue: Queue[bytes | None],
+    out_file_name: str,
+    new_audio_in: Callable[[], AudioSource] = AudioIn,
+    prompt=True,
+    new_classify_sample: Callable[
+        [], Callable[[NDArray[np.int16]], bool]
+    ] = get_classify_sample,
+    stats_interval: float | None = None,
+    queue_size=DEFAULT_QUEUE_SIZE,
+):
+    """Endpoint speech from the source `new_audio_in` creates using the
+    classifier `new_classify_sample` creates, and record into `out_file_name`.
+    Wait for the user to press Enter first if `prompt`.
+    Log statistics every `stats_interval` seconds if given.
+    Internal queues hold at most `queue_size` chunks and block when full, so a
+    slow consumer of `byte_queue` slows recording down unless `byte_queue` is
+    a `BoundedQueue` that drops or coalesces. The audio source's own queue is
+    bounded too, so memory stays bounded either way."""
+    write_queue: BoundedQueue[bytes] = BoundedQueue(queue_size)
+    overlay_queue: BoundedQueue[bytes] = BoundedQueue(queue_size)
+
+    with wave.open(out_file_name, "wb") as out_file, new_audio_in() as audio_in:
         # Configure output file.
         out_file.setnchannels(N_CHANNEL)
-        out_file.setsampwidth(audio_in.py_audio.get_sample_size(RESOLUTION_FORMAT))
+        out_file.setsampwidth(SIZEOF_FRAME)
         out_file.setframerate(SAMPLING_RATE)
         writer_thread = Thread(
             target=frame_writing_thread, args=(out_file, write_queue)
         )
         writer_thread.start()
 
+        stop_logging = None
         try:
-            input("Press Enter to start recording...")
+            input("Press Enter to start recording...") if prompt else None
             audio_in.discard_first_at_least()
             print("Recording...")
 
-            endpointer = Endpointer(audio_in, overlay_queue)
+            endpointer = Endpointer(
+                audio_in, overlay_queue, classify_sample=new_classify_sample()
+            )
+            if stats_interval is not None:
+                stop_logging = log_periodically(
+                    "Recording",
+                    lambda: {
+                        "audio_in": audio_in.stats.summary(),
+                        "audio_queue": audio_in.audio_queue.stats.summary(),
+                        "endpointer": endpointer.stats.summary(),
+                        "overlay_queue": overlay_queue.stats.summary(),
+                        "write_queue": write_queue.stats.summary(),
+                        **(
+                            {"byte_queue": byte_queue.stats.summary()}
+                            if isinstance(byte_queue, BoundedQueue)
+                            else {}
+                        ),
+                    },
+                    stats_interval,
+                )
             while data := overlay_queue.get():
                 write_queue.put(data)
                 byte_queue.put(data)
             print("Stopping recording.")
-            del endpointer
         finally:
+            if stop_logging is not None:
+                stop_logging.set()
             write_queue.put(None)
             byte_queue.put(None)
             writer_thread.join(timeout=0.1)
@@ -55,6 +106,71 @@ MAXIMUM_DRAWING_TIME = 10
 """Maximum duration of the spectrum plot"""
 MAX_DRAWING_SAMPLES = SAMPLING_RATE * MAXIMUM_DRAWING_TIME
 """Maximum number of samples drawn"""
+N_CHUNK_PER_DRAW = 5
+"""Number of audio chunks received between redraws, to avoid GUI latency."""
+
+
+class WaveformBuffer:
+    """Preallocated ring buffer of the latest `capacity` audio samples."""
+
+    def __init__(self, capacity: int):
+        self.samples = np.zeros(capacity, dtype=np.int16)
+        self.end = 0
+        self.size = 0
+
+    def extend(self, audio_array: NDArray[np.int16]):
+        capacity = len(self.samples)
+        audio_array = audio_array[-capacity:]
+        n_sample = len(audio_array)
+        n_first = min(n_sample, capacity - self.end)
+        self.samples[self.end : self.end + n_first] = audio_array[:n_first]
+        self.samples[: n_sample - n_first] = audio_array[n_first:]
+        self.end = (self.end + n_sample) % capacity
+        self.size = min(self.size + n_sample, capacity)
+
+    def ordered(self) -> NDArray[np.int16]:
+        """The buffered samples from oldest to newest, without copying until
+        the buffer wraps around."""
+        if self.size < len(self.samples):
+            return self.samples[: self.size]
+        return np.concatenate((self.samples[self.end :], self.samples[: self.end]))
+
+
+def min_max_decimate(
+    audio_array: NDArray[np.int16], bin_size: int
+) -> tuple[NDArray[np.int64], NDArray[np.int16]]:
+    """Reduce `audio_array` to the minimum and maximum of each `bin_size`
+    samples, interleaved so a line through them draws the waveform envelope.
+    Return the sample index of each point and the points. Samples after the
+    last full bin are left out."""
+    n_bin = len(audio_array) // bin_size
+    bins = audio_array[: n_bin * bin_size].reshape(n_bin, bin_size)
+    envelope = np.empty(2 * n_bin, dtype=np.int16)
+    envelope[0::2] = bins.min(axis=1)
+    envelope[1::2] = bins.max(axis=1)
+    return np.repeat(np.arange(n_bin) * bin_size, 2), envelope
+
+
+def plot_waveform(byte_queue: Queue[bytes | None]):
+    """Plot the latest `MAXIMUM_DRAWING_TIME` seconds of audio from
+    `byte_queue`, decimated to about one bin per horizontal pixel and updated
+    in place."""
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([], [], linewidth=0.5)
+    ax.set_xlim(0, MAXIMUM_DRAWING_TIME)
+    ax.set_ylim(np.iinfo(np.int16).min, np.iinfo(np.int16).max)
+    n_pixel = int(fig.get_figwidth() * fig.dpi)
+    bin_size = max(1, -(-MAX_DRAWING_SAMPLES // n_pixel))
+    waveform = WaveformBuffer(MAX_DRAWING_SAMPLES)
+    n_chunk = 0
+    while data := byte_queue.get():
+        waveform.extend(np.frombuffer(data, dtype=np.int16))
+        n_chunk += 1
+        if n_chunk % N_CHUNK_PER_DRAW == 0:
+            indexes, envelope = min_max_decimate(waveform.ordered(), bin_size)
+            line.set_data(indexes / SAMPLING_RATE, envelope)
+            fig.canvas.draw_idle()
+            plt.pause(0.01)
 
 
 def main() -> None:
@@ -62,35 +178,60 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Recorder")
     parser.add_argument("-g", "--gui", action="store_true", help="Show spectrum GUI.")
     parser.add_argument("-o", "--output", help="Output file directory")
+    parser.add_argument(
+        "-s",
+        "--spectral-vad",
+        action="store_true",
+        help="Endpoint with band energy, spectral flatness and zero crossings.",
+    )
+    parser.add_argument(
+        "-t",
+        "--stats-interval",
+        type=float,
+        help="Log capture statistics every this many seconds, with PYTHON_LOG=info.",
+    )
+    parser.add_argument(
+        "-q",
+        "--queue-size",
+        default=DEFAULT_QUEUE_SIZE,
+        type=int,
+        help="Maximum number of audio chunks queued between threads.",
+    )
+    parser.add_argument(
+        "--gui-policy",
+        choices=[policy.value for policy in QueuePolicy],
+        default=QueuePolicy.COALESCE.value,
+        help="What to do when the GUI falls behind by a full queue.",
+    )
     args = parser.parse_args()
 
     out_file_name = args.output or "output.wav"
+    new_classify_sample = (
+        get_classify_sample_spectral if args.spectral_vad else get_classify_sample
+    )
 
-    byte_queue: Queue[bytes | None] = Queue()
+    # Without the GUI, nothing consumes `byte_queue`.
+    byte_queue: BoundedQueue[bytes] = BoundedQueue(
+        args.queue_size,
+        QueuePolicy(args.gui_policy) if args.gui else QueuePolicy.DROP,
+        keep_last_bytes(MAX_DRAWING_SAMPLES * SIZEOF_FRAME),
+    )
     audio_thread = Thread(
-        target=audio_recording_thread, args=(byte_queue, out_file_name)
+        target=audio_recording_thread,
+        args=(
+            byte_queue,
+            out_file_name,
+            lambda: AudioIn(args.queue_size),
+            True,
+            new_classify_sample,
+            args.stats_interval,
+            args.queue_size,
+        ),
     )
     audio_thread.start()
 
     if args.gui:
-        _, ax = plt.subplots()
-        plot_array = np.array([])
-        i = 0
-        while data := byte_queue.get():
-            input_arr = np.frombuffer(data, dtype=np.int16)
-            plot_array = np.append(plot_array, input_arr)
-            i += 1
-            if i % 5 == 0:
-                # draw every 5 chunks to avoid gui latency
-                num_samples = plot_array.shape[0]
-                length = num_samples / SAMPLING_RATE
-                lspace = np.linspace(0, length, plot_array.shape[0])
-                ax.clear()
-                ax.scatter(lspace, plot_array, 0.05)
-                plt.draw()
-                plt.pause(0.01)
-            if plot_array.shape[0] > MAX_DRAWING_SAMPLES:
-                plot_array = plot_array[-MAX_DRAWING_SAMPLES:]
+        plot_waveform(byte_queue)
 
     audio_thread.join()
 
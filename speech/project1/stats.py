@@ -0,0 +1,64 @@
+from bisect import bisect_left
+from logging import INFO, getLogger, info
+from threading import Event, Thread
+from typing import Callable, Sequence
+
+LATENCY_BOUNDS = tuple(1e-6 * 2**exponent for exponent in range(24))
+"""Histogram bucket upper bounds in seconds, from 1 μs to about 8 s."""
+DEPTH_BOUNDS = (0, *(2**exponent for exponent in range(11)))
+"""Histogram bucket upper bounds for queue depths, from 0 to 1024."""
+
+
+class Histogram:
+    """Histogram of non-negative values in buckets with upper bounds `bounds`,
+    plus an overflow bucket."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the `q` quantile, or the
+        maximum for the overflow bucket."""
+        rank = q * self.count
+        n_seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            n_seen += count
+            if n_seen >= rank and n_seen > 0:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+def log_periodically(
+    name: str, summarize: Callable[[], dict], interval: float
+) -> Event:
+    """Log `summarize()` every `interval` seconds in a background thread until
+    the returned event is set. `summarize` is only called if info logging is
+    enabled."""
+    stopping = Event()
+
+    def log_all():
+        while not stopping.wait(interval):
+            if getLogger().isEnabledFor(INFO):
+                info("%s stats: %s", name, summarize())
+
+    Thread(target=log_all, args=(), daemon=True).start()
+    return stopping
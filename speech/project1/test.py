@@ -1,27 +1,42 @@
 """Run with `python3 -m speech.project1.test`."""
 
+import asyncio
+import os
+import tempfile
 import unittest
 
 import matplotlib.pyplot as plt
 import numpy as np
 
 from speech.project1 import open_wave_file
-from speech.project1.audio_in import N_FRAME_PER_CHUNK
-from speech.project1.endpoint import get_classify_sample
-
-
-def process(my_list, classify_frame):
-    result = []
-    for i in range(0, len(my_list), N_FRAME_PER_CHUNK):
-        batch = my_list[i : i + N_FRAME_PER_CHUNK]
-        result.append(classify_frame(batch))
-    return result
+from speech.project1.audio_in import (
+    N_FRAME_PER_CHUNK,
+    SyntheticAudioIn,
+    WaveFileAudioIn,
+)
+from speech.project1.bounded_queue import BoundedQueue, QueuePolicy, keep_last_bytes
+from speech.project1.capture_server import (
+    AudioConsumer,
+    CaptureServer,
+    stream_wave_file,
+    wave_file_chunks,
+)
+from speech.project1.corpus_recorder import (
+    MANIFEST_FILE_NAME,
+    read_manifest,
+    record_corpus,
+    speech_segments,
+)
+from speech.project1.endpoint import (
+    endpoint_samples,
+    get_classify_sample,
+    get_classify_sample_spectral,
+)
+from speech.project2 import read_audio_file
 
 
 class TestAudio(unittest.TestCase):
     def test_1(self):
-        classify_frame = get_classify_sample()
-
         with open_wave_file("output.wav", "rb") as wave_file:
             sample_rate = wave_file.getframerate()
             num_frames = wave_file.getnframes()
@@ -29,7 +44,7 @@ class TestAudio(unittest.TestCase):
 
         duration = num_frames / sample_rate
         audio_array = np.frombuffer(frames, dtype=np.int16)
-        boolean_array = process(audio_array, classify_frame)
+        boolean_array, _, _ = endpoint_samples(audio_array)
         lspace = np.linspace(0, duration, len(audio_array))
         plt.scatter(lspace, audio_array, 0.5)
         filtered = [
@@ -43,5 +58,117 @@ class TestAudio(unittest.TestCase):
 
         plt.savefig("plot.png")
 
+    def test_endpoint_samples(self):
+        audio_array = read_audio_file("recordings/one10.wav")
+        classify_frame = get_classify_sample()
+        expected = [
+            classify_frame(audio_array[i : i + N_FRAME_PER_CHUNK])
+            for i in range(0, len(audio_array), N_FRAME_PER_CHUNK)
+        ]
+        is_speech, start, end = endpoint_samples(audio_array)
+        self.assertEqual(is_speech.tolist(), expected)
+        self.assertLess(start, end)
+
+    def test_spectral_vad(self):
+        silence = read_audio_file("recordings/silence0.wav")
+        rng = np.random.default_rng(0)
+        fan = (silence + rng.normal(0, 6000, len(silence))).astype(np.int16)
+        speech = read_audio_file("recordings/one10.wav")
+        noisy_start = np.concatenate((silence, fan, silence, speech))
+
+        def n_speech_chunk(classify_frame, arr):
+            return sum(
+                classify_frame(arr[i : i + N_FRAME_PER_CHUNK])
+                for i in range(0, len(arr), N_FRAME_PER_CHUNK)
+            )
+
+        fan_end = 2 * len(silence)
+        self.assertGreater(
+            n_speech_chunk(get_classify_sample(), noisy_start[:fan_end]), 0
+        )
+        self.assertEqual(
+            n_speech_chunk(get_classify_sample_spectral(), noisy_start[:fan_end]), 0
+        )
+        self.assertGreater(
+            n_speech_chunk(get_classify_sample_spectral(), noisy_start), 0
+        )
+
+    def test_capture_server(self):
+        file_names = [f"recordings/{number}10.wav" for number in ("one", "two")]
+        server = CaptureServer(lambda _: AudioConsumer(lambda arr: arr.size))
+
+        async def serve():
+            in_process = [
+                server.serve_chunks(file_name, wave_file_chunks(file_name))
+                for file_name in file_names
+            ]
+            socket_server = await server.start(port=0)
+            port = socket_server.sockets[0].getsockname()[1]
+            async with socket_server:
+                over_socket = [
+                    stream_wave_file(file_name, port=port) for file_name in file_names
+                ]
+                return await asyncio.gather(*in_process, *over_socket)
+
+        results = asyncio.run(serve())
+        for file_name, in_process, over_socket in zip(
+            file_names, results, results[len(file_names) :]
+        ):
+            _, start, end = endpoint_samples(read_audio_file(file_name))
+            self.assertEqual(in_process, end - start)
+            self.assertEqual(over_socket, str(end - start))
+
+    def test_bounded_queue(self):
+        dropping = BoundedQueue(2, QueuePolicy.DROP)
+        coalescing = BoundedQueue(2, QueuePolicy.COALESCE, keep_last_bytes(4))
+        for data in (b"ab", b"cd", b"ef", b"gh", None):
+            dropping.put(data)
+            coalescing.put(data)
+        self.assertEqual(list(iter(dropping.get, None)), [b"ef", b"gh"])
+        self.assertEqual(list(iter(coalescing.get, None)), [b"ab", b"efgh"])
+        self.assertEqual(dropping.stats.n_dropped, 2)
+        self.assertEqual(coalescing.stats.n_coalesced, 2)
+        self.assertEqual(coalescing.stats.lag_seconds.count, 3)
+
+        blocking = BoundedQueue(1)
+        blocking.put(b"ab")
+        blocking.put(None, timeout=0.1)
+        self.assertEqual(list(iter(blocking.get, None)), [b"ab"])
+
+    def test_bounded_audio_source(self):
+        with SyntheticAudioIn(1000, realtime=False, queue_size=4) as audio_in:
+            while not audio_in.audio_queue.full():
+                pass
+            n_chunk = 0
+            while not (audio_in.finished.is_set() and audio_in.audio_queue.empty()):
+                self.assertLessEqual(audio_in.audio_queue.qsize(), 4)
+                audio_in.audio_queue.get(timeout=1)
+                n_chunk += 1
+        self.assertEqual(n_chunk, 1000 // 20)
+        self.assertGreater(audio_in.audio_queue.stats.n_blocked, 0)
+
+    def test_corpus_recorder(self):
+        silences = [f"recordings/silence{index}.wav" for index in range(5)]
+        file_names = ["recordings/one10.wav", *silences, "recordings/two10.wav"]
+        with tempfile.TemporaryDirectory() as out_dir, WaveFileAudioIn(
+            *silences[:1], *file_names, realtime=False
+        ) as audio_in:
+            segments = speech_segments(audio_in, get_classify_sample())
+            written = record_corpus(segments, ["one", "two"], out_dir)
+            manifest = read_manifest(os.path.join(out_dir, MANIFEST_FILE_NAME))
+            self.assertEqual(manifest, written)
+            self.assertEqual([segment.label for segment in written], ["one", "two"])
+            for segment in written:
+                audio_array = read_audio_file(segment.path)
+                self.assertAlmostEqual(segment.duration, len(audio_array) / 16000)
+
+    def test_corpus_recorder_write_failure(self):
+        segments = iter((b"\0\0" * 160, b"\0\0" * 160))
+        with tempfile.TemporaryDirectory() as out_dir:
+            with self.assertLogs(level="ERROR"), self.assertRaises(FileNotFoundError):
+                record_corpus(segments, ["one", "missing/two"], out_dir)
+            manifest = read_manifest(os.path.join(out_dir, MANIFEST_FILE_NAME))
+            self.assertEqual([segment.label for segment in manifest], ["one"])
+
 
 unittest.main() if __name__ == "__main__" else None
@@ -9,12 +9,11 @@ from threading import Thread
 import numpy as np
 from numpy.typing import NDArray
 
-from speech.project1 import CHUNK_MS, MS_IN_SECOND, SAMPLING_RATE
 from speech.project1.main import audio_recording_thread
 from speech.project2.lib import (
+    MultiBankMelSpectra,
     Segmenter,
     cep2spec,
-    mel_spectrum_from_frame,
     plot_cepstra,
     plot_log_mel_spectra,
     pre_emphasis,
@@ -63,21 +62,16 @@ def main():
     )
     audio_thread.start()
 
-    segmenter = Segmenter(SAMPLING_RATE * CHUNK_MS // MS_IN_SECOND)
-    mel_spectra = list(
-        np.array([], dtype=np.float32).reshape(n_filter_banks, 0)
-        for n_filter_banks in NS_FILTER_BANKS
-    )
+    segmenter = Segmenter()
+    multi_bank_mel_spectra = MultiBankMelSpectra(NS_FILTER_BANKS)
     while (data := byte_queue.get()) is not None:
         audio_array = np.frombuffer(data, dtype=np.int16)
         segmenter.add_sample(pre_emphasis(audio_array))
-        while (frame := segmenter.next()) is not None:
-            for index, n_filter_banks in enumerate(NS_FILTER_BANKS):
-                mel_spectrum = mel_spectrum_from_frame(frame, n_filter_banks)
-                mel_spectra[index] = np.hstack(
-                    (mel_spectra[index], mel_spectrum[:, np.newaxis])
-                )
-    for mel_spectrum, n_filter_banks in zip(mel_spectra, NS_FILTER_BANKS):
+        multi_bank_mel_spectra.add_frames(segmenter.frames())
+    for mel_spectra, n_filter_banks in zip(
+        multi_bank_mel_spectra.mel_spectra(), NS_FILTER_BANKS
+    ):
+        mel_spectrum = mel_spectra.T
         cep, _ = spec2cep(mel_spectrum, ncep=13)
         plot_audio(cep, mel_spectrum, out_plot_name, n_filter_banks)
 
@@ -1,4 +1,5 @@
 import math
+from dataclasses import dataclass
 from functools import lru_cache
 
 import numpy as np
@@ -6,38 +7,100 @@ import scipy
 from matplotlib import pyplot as plt
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
+from numpy.lib.stride_tricks import sliding_window_view
 from numpy.typing import NDArray
 from scipy import fft
 from scipy.signal import spectrogram
 
+from speech import DoubleArray
 from speech.project1 import CHUNK_MS, MS_IN_SECOND, SAMPLING_RATE
 
+PRE_EMPHASIS_ALPHA = 0.95
+"""Pre-emphasis coefficient of the front end."""
 
-def pre_emphasis(signal: NDArray, alpha: float = 0.95) -> NDArray[np.float32]:
-    """Apply pre-emphasis to the input signal."""
+
+def pre_emphasis(
+    signal: NDArray, alpha: float = PRE_EMPHASIS_ALPHA, previous: float | None = None
+) -> NDArray[np.float32]:
+    """Apply pre-emphasis to the input signal, continuing from the `previous`
+    sample if `signal` is a later part of a stream."""
     pre_emphasized_signal = signal.astype(np.float32, copy=True)
     pre_emphasized_signal[1:] -= alpha * pre_emphasized_signal[:-1]
+    if previous is not None:
+        pre_emphasized_signal[:1] -= alpha * np.array([previous], dtype=np.float32)
     return pre_emphasized_signal
 
 
+N_FRAME_WINDOW = SAMPLING_RATE * CHUNK_MS // MS_IN_SECOND
+"""Number of samples in each frame."""
+FEATURE_DTYPE = np.float32
+"""Floating-point type of the batch front end after pre-emphasis and framing,
+which are always `np.float32`: windowed frames, FFT powers, Mel spectra, their
+logarithm, cepstra and their deltas, and the cached window, filter banks and
+DCT matrix they are computed with. Pass `dtype=np.float64` for double
+precision."""
+FRONT_END_VERSION = 1
+"""Version of the front-end algorithm from pre-emphasis to the boosted MFCC
+features. Bump it whenever a change alters the features, so cached and
+stored features are recomputed."""
+
+
 class Segmenter:
-    def __init__(self, window_size: int):
+    """Split audio added piece by piece into frames of `window_size` samples
+    overlapping by half. Samples are kept in a preallocated buffer that is
+    only compacted when full and doubled when too small, and frames are views
+    into it that stay valid until the next `add_sample`."""
+
+    def __init__(self, window_size: int = N_FRAME_WINDOW):
         self.window_size = window_size
         self.half_window_size = window_size // 2
-        self.buffer: NDArray[np.float32] = np.array([], dtype=np.float32)
+        self.buffer: NDArray[np.float32] = np.empty(4 * window_size, dtype=np.float32)
+        self.start = 0
+        self.end = 0
 
     def add_sample(self, sample: NDArray[np.float32]):
         """Add a sample to be segmented."""
-        self.buffer = np.concatenate((self.buffer, sample))
+        n_new = len(sample)
+        if self.end + n_new > len(self.buffer):
+            n_kept = self.end - self.start
+            if n_kept + n_new > len(self.buffer):
+                buffer = np.empty(
+                    max(2 * len(self.buffer), n_kept + n_new), dtype=np.float32
+                )
+                buffer[:n_kept] = self.buffer[self.start : self.end]
+                self.buffer = buffer
+            else:
+                self.buffer[:n_kept] = self.buffer[self.start : self.end]
+            self.start, self.end = 0, n_kept
+        self.buffer[self.end : self.end + n_new] = sample
+        self.end += n_new
 
     def next(self) -> NDArray[np.float32] | None:
         """Segment the collected audio signal into frames."""
-        if len(self.buffer) < self.window_size:
+        if self.end - self.start < self.window_size:
             return None
-        result = self.buffer[: self.window_size]
-        self.buffer = self.buffer[self.half_window_size :]
+        result = self.buffer[self.start : self.start + self.window_size]
+        self.start += self.half_window_size
         return result
 
+    def frames(self) -> NDArray[np.float32]:
+        """All the frames `next` would yield, as rows of one view."""
+        frames = frames_from_signal(
+            self.buffer[self.start : self.end], self.window_size
+        )
+        self.start += len(frames) * self.half_window_size
+        return frames
+
+
+def frames_from_signal(
+    signal: NDArray[np.float32], window_size=N_FRAME_WINDOW
+) -> NDArray[np.float32]:
+    """Read-only view of `signal` as rows of the same frames `Segmenter`
+    yields, overlapping by half."""
+    if len(signal) < window_size:
+        return np.empty((0, window_size), dtype=signal.dtype)
+    return sliding_window_view(signal, window_size)[:: window_size // 2]
+
 
 def window(samples: NDArray[np.float32]) -> NDArray[np.float32]:
     """Applies the Hanning window function to the given audio samples."""
@@ -46,9 +109,11 @@ def window(samples: NDArray[np.float32]) -> NDArray[np.float32]:
 
 
 @lru_cache(maxsize=8)
-def hanning(m: int):
-    """The Hanning window function for the first `m` points."""
-    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(m) / m)
+def hanning(m: int, dtype: type[np.floating] = np.float64):
+    """Read-only Hanning window function for the first `m` points."""
+    hanning_window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(m) / m)).astype(dtype)
+    hanning_window.setflags(write=False)
+    return hanning_window
 
 
 def fast_fourier_transform(samples: NDArray[np.float32]) -> NDArray[np.complex_]:
@@ -81,6 +146,22 @@ def power_spectrum_after_fft(transformed: NDArray[np.complex_]) -> NDArray[np.fl
     return powers / m
 
 
+def power_spectra_from_frames(
+    frames: NDArray[np.float32], dtype: type[np.floating] = FEATURE_DTYPE
+) -> tuple[int, NDArray[np.floating]]:
+    """FFT size and power spectra of Hanning-windowed `frames`, each row a
+    frame, via one real FFT over all of them, in `dtype`. Each row matches
+    `power_spectrum_after_fft(fast_fourier_transform(window(frame)))`."""
+    m = frames.shape[1]
+    fft_size = 1 << math.ceil(math.log2(m))
+    transformed = fft.rfft(frames * hanning(m, dtype), n=fft_size, axis=1)
+    powers = np.square(transformed.real, dtype=dtype) + np.square(
+        transformed.imag, dtype=dtype
+    )
+    powers /= fft_size
+    return fft_size, powers
+
+
 def powspec(
     samples: NDArray, sr=8000, wintime=0.025, steptime=0.010
 ) -> NDArray[np.float32]:
@@ -111,8 +192,10 @@ def filter_banks_from_frequencies(
     n_useful_point: int,
     sampling_rate: int,
     n_bank: int,
+    dtype: type[np.floating] = np.float64,
 ):
-    """Filter banks matrix for converting power spectrum into Mel spectrum."""
+    """Read-only filter banks matrix in `dtype` for converting power spectrum
+    into Mel spectrum."""
 
     frequencies = frequencies_after_fft(fft_size, sampling_rate)
     maxfrq = sampling_rate / 2
@@ -134,7 +217,8 @@ def filter_banks_from_frequencies(
 
     # Normalize each row
     row_sums = banks_matrix.sum(axis=1)
-    banks_matrix = banks_matrix / row_sums[:, np.newaxis]
+    banks_matrix = (banks_matrix / row_sums[:, np.newaxis]).astype(dtype)
+    banks_matrix.setflags(write=False)
 
     return banks_matrix
 
@@ -177,6 +261,22 @@ INVERSE_ROOT_TWO = 1 / np.sqrt(2)
 N_MFCC_COEFFICIENTS = 13
 
 
+@lru_cache(maxsize=8)
+def dct_matrix(
+    nrow: int, ncep: int, dtype: type[np.floating] = np.float64
+) -> NDArray[np.floating]:
+    """Read-only `(ncep, nrow)` DCT matrix in `dtype` taking `nrow` log
+    spectral samples to `ncep` cepstral coefficients."""
+    i = np.arange(ncep)
+    dctm = np.cos(
+        (i[:, np.newaxis] - 1) * np.arange(1, 2 * nrow, 2) / (2 * nrow) * np.pi
+    ) * np.sqrt(2 / nrow)
+    dctm[0, :] *= INVERSE_ROOT_TWO
+    dctm = dctm.astype(dtype)
+    dctm.setflags(write=False)
+    return dctm
+
+
 def spec2cep(spec, ncep=N_MFCC_COEFFICIENTS):
     """
     Calculate cepstra from spectral samples via DCT.
@@ -184,31 +284,23 @@ def spec2cep(spec, ncep=N_MFCC_COEFFICIENTS):
     Each column represents a set of cepstral coefficients derived from a particular frame.
     Each row represents an individual cepstral coefficient.
     """
-    nrow = spec.shape[0]
-
-    i = np.arange(ncep)
-    dctm = np.cos(
-        (i[:, np.newaxis] - 1) * np.arange(1, 2 * nrow, 2) / (2 * nrow) * np.pi
-    ) * np.sqrt(2 / nrow)
-    dctm[0, :] *= INVERSE_ROOT_TWO
-
+    dctm = dct_matrix(spec.shape[0], ncep)
     cep = np.dot(dctm, np.log(spec))
     return cep, dctm
 
 
-def cep2spec(cep, nfreq=40):
-    ncep = cep.shape[0]
-
-    i = np.arange(ncep)
-    dctm = np.cos(
-        (i[:, np.newaxis] - 1) * np.arange(1, 2 * nfreq, 2) / (2 * nfreq) * np.pi
-    ) * np.sqrt(2 / nfreq)
+@lru_cache(maxsize=8)
+def idct_matrix(
+    nfreq: int, ncep: int, dtype: type[np.floating] = np.float64
+) -> NDArray[np.floating]:
+    """Read-only `(nfreq, ncep)` inverse DCT matrix in `dtype` taking `ncep`
+    cepstral coefficients back to `nfreq` log spectral samples."""
+    return dct_matrix(nfreq, ncep, dtype).T
 
-    dctm[0, :] *= INVERSE_ROOT_TWO
-    idctm = dctm.T
 
+def cep2spec(cep, nfreq=40):
+    idctm = idct_matrix(nfreq, cep.shape[0])
     spec = np.exp(np.dot(idctm, cep))
-
     return spec, idctm
 
 
@@ -262,6 +354,109 @@ def mel_spectrum_and_cepstrum_from_frame(
     return mel_spectrum, cepstrum
 
 
+def mel_spectra_and_cepstra_from_frames(
+    frames: NDArray[np.float32],
+    n_filter_banks: int,
+    ncep=N_MFCC_COEFFICIENTS,
+    dtype: type[np.floating] = FEATURE_DTYPE,
+) -> tuple[NDArray[np.floating], NDArray[np.floating]]:
+    """Mel spectra and cepstra of `frames`, each row a frame, in `dtype`, with
+    the Mel projection and the DCT each as one matrix product over all frames.
+    Each row matches `mel_spectrum_and_cepstrum_from_frame`."""
+    fft_size, power_spectra = power_spectra_from_frames(frames, dtype)
+    banks_matrix = filter_banks_from_frequencies(
+        fft_size, power_spectra.shape[1], SAMPLING_RATE, n_filter_banks, dtype
+    )
+    mel_spectra = power_spectra @ banks_matrix.T
+    cepstra = np.log(mel_spectra) @ dct_matrix(n_filter_banks, ncep, dtype).T
+    return mel_spectra, cepstra
+
+
+@lru_cache(maxsize=8)
+def stacked_filter_banks(
+    fft_size: int,
+    n_useful_point: int,
+    sampling_rate: int,
+    ns_bank: tuple[int, ...],
+    dtype: type[np.floating] = np.float64,
+) -> NDArray[np.floating]:
+    """Read-only filter banks matrices for each number of banks in `ns_bank`,
+    stacked into one `(sum(ns_bank), n_useful_point)` matrix."""
+    banks_matrix = np.vstack(
+        [
+            filter_banks_from_frequencies(
+                fft_size, n_useful_point, sampling_rate, n_bank, dtype
+            )
+            for n_bank in ns_bank
+        ]
+    )
+    banks_matrix.setflags(write=False)
+    return banks_matrix
+
+
+def mel_spectra_for_banks(
+    fft_size: int,
+    power_spectra: NDArray[np.floating],
+    ns_bank: tuple[int, ...],
+    out: NDArray[np.floating] | None = None,
+) -> list[NDArray[np.floating]]:
+    """Mel spectra of `power_spectra`, each row a frame, for each number of
+    banks in `ns_bank`, from one matrix product with the stacked filter banks
+    written into `out` if given. Return views of the Mel spectra for each
+    number of banks."""
+    banks_matrix = stacked_filter_banks(
+        fft_size,
+        power_spectra.shape[1],
+        SAMPLING_RATE,
+        ns_bank,
+        power_spectra.dtype.type,
+    )
+    stacked = np.matmul(power_spectra, banks_matrix.T, out=out)
+    offsets = np.cumsum(ns_bank)
+    return np.split(stacked, offsets[:-1], axis=1)
+
+
+class MultiBankMelSpectra:
+    """Accumulate the Mel spectra of frames for each number of banks in
+    `ns_bank` in `dtype`, with one FFT per frame, into one preallocated array
+    doubled when full."""
+
+    def __init__(
+        self,
+        ns_bank: tuple[int, ...],
+        dtype: type[np.floating] = FEATURE_DTYPE,
+        capacity=256,
+    ):
+        self.ns_bank = ns_bank
+        self.dtype = dtype
+        self.stacked = np.empty((capacity, sum(ns_bank)), dtype=dtype)
+        self.n_frame = 0
+
+    def add_frames(self, frames: NDArray[np.float32]):
+        """Add `frames`, each row a frame."""
+        if len(frames) == 0:
+            return
+        fft_size, power_spectra = power_spectra_from_frames(frames, self.dtype)
+        n_frame = self.n_frame + len(frames)
+        if n_frame > len(self.stacked):
+            stacked = np.empty(
+                (max(2 * len(self.stacked), n_frame), self.stacked.shape[1]),
+                dtype=self.dtype,
+            )
+            stacked[: self.n_frame] = self.stacked[: self.n_frame]
+            self.stacked = stacked
+        mel_spectra_for_banks(
+            fft_size, power_spectra, self.ns_bank, self.stacked[self.n_frame : n_frame]
+        )
+        self.n_frame = n_frame
+
+    def mel_spectra(self) -> list[NDArray[np.floating]]:
+        """Views of the Mel spectra so far for each number of banks, each row
+        a frame."""
+        offsets = np.cumsum(self.ns_bank)
+        return np.split(self.stacked[: self.n_frame], offsets[:-1], axis=1)
+
+
 class RunningMeanVariance:
     """For normalizing Mel cepstra on-the-fly using the current running mean
     and variance."""
@@ -279,26 +474,214 @@ class RunningMeanVariance:
         """Normalize `new_sample` in place so it has 0 mean and 1 standard
         deviation, and update `self`'s mean and variance."""
         assert new_sample.shape == self.mean.shape
-        self.mean = (self.n * self.mean + new_sample) / (self.n + 1)
-        np.subtract(new_sample, self.mean, out=new_sample)
-        self.variance = (self.n * self.variance + np.square(new_sample)) / (self.n + 1)
-        if self.variance.any() > 0:
-            np.divide(new_sample, np.sqrt(self.variance), out=new_sample)
-        self.n += 1
+        self.normalize_and_update_block(new_sample[np.newaxis])
         return new_sample
 
-
-def derive_cepstrum_velocities(cepstrum: NDArray[np.float32]) -> NDArray[np.float32]:
-    """Derive the delta and delta delta value of `cepstrum`."""
+    def normalize_and_update_block(self, new_samples: NDArray[np.float32]):
+        """Normalize each row of `new_samples` in place as
+        `normalize_and_update` would one after another, but all at once."""
+        assert new_samples.shape[1:] == self.mean.shape
+        counts = np.arange(self.n + 1, self.n + len(new_samples) + 1)[:, np.newaxis]
+        means = (self.n * self.mean + np.cumsum(new_samples, axis=0)) / counts
+        np.subtract(new_samples, means, out=new_samples)
+        variances = (
+            self.n * self.variance + np.cumsum(np.square(new_samples), axis=0)
+        ) / counts
+        np.divide(new_samples, np.sqrt(variances), out=new_samples, where=variances > 0)
+        if len(new_samples) > 0:
+            self.mean = means[-1].astype(np.float32)
+            self.variance = variances[-1].astype(np.float32)
+            self.n += len(new_samples)
+        return new_samples
+
+
+def _difference_across_columns(values: NDArray, out: NDArray):
+    """Write the difference between the next and previous column of `values`
+    into `out`, repeating the first and last column at the edges."""
+    if values.shape[1] < 2:
+        out[:] = 0
+        return
+    np.subtract(values[:, 2:], values[:, :-2], out=out[:, 1:-1])
+    np.subtract(values[:, 1], values[:, 0], out=out[:, 0])
+    np.subtract(values[:, -1], values[:, -2], out=out[:, -1])
+
+
+def derive_cepstrum_velocities(
+    cepstrum: NDArray[np.float32], out: NDArray[np.float32] | None = None
+) -> NDArray[np.float32]:
+    """Derive the delta and delta delta value of `cepstrum`, written after it
+    into `out` of shape (T, 3·D) if given."""
     cepstrum = np.atleast_2d(cepstrum)
-
-    padded_cepstrum = np.pad(cepstrum, ((0, 0), (1, 1)), mode="edge")
-    delta = padded_cepstrum[:, 2:] - padded_cepstrum[:, :-2]
-    padded_delta = np.pad(delta, ((0, 0), (1, 1)), mode="edge")
-    delta_delta = padded_delta[:, 2:] - padded_delta[:, :-2]
-
-    result = np.hstack((cepstrum, delta, delta_delta))
-    return result.squeeze()
+    n_coefficient = cepstrum.shape[1]
+    if out is None:
+        out = np.empty((len(cepstrum), 3 * n_coefficient), dtype=cepstrum.dtype)
+    out[:, :n_coefficient] = cepstrum
+    delta = out[:, n_coefficient : 2 * n_coefficient]
+    _difference_across_columns(cepstrum, delta)
+    _difference_across_columns(delta, out[:, 2 * n_coefficient :])
+    return out.squeeze()
+
+
+DEFAULT_VELOCITY_WINDOW = 2
+"""Default number of frames on each side regression velocities use."""
+
+
+def _regress(padded: NDArray, window: int, out: NDArray, scratch: NDArray):
+    """Write into `out` the regression velocity of each row of `padded` with
+    `window` context rows on each side, i.e.,
+    Σₖ k (padded[t + k] - padded[t - k]) / (2 Σₖ k²) for k = 1..`window`."""
+    n_row = len(out)
+    out[:] = 0
+    for k in range(1, window + 1):
+        np.subtract(
+            padded[window + k : window + k + n_row],
+            padded[window - k : window - k + n_row],
+            out=scratch[:n_row],
+        )
+        scratch[:n_row] *= k
+        out += scratch[:n_row]
+    out /= 2 * sum(k * k for k in range(1, window + 1))
+
+
+def _regression_velocities_from_padded(
+    padded: NDArray,
+    window: int,
+    out: NDArray,
+    extended_delta: NDArray,
+    scratch: NDArray,
+) -> NDArray:
+    """Write into `out` the cepstra, deltas and delta deltas of the rows of
+    `padded` that have `2 × window` context rows on each side, using
+    `extended_delta` and `scratch` of `len(out) + 2 × window` rows as work
+    space."""
+    n_row, n_coefficient = len(out), padded.shape[1]
+    out[:, :n_coefficient] = padded[2 * window : 2 * window + n_row]
+    _regress(padded, window, extended_delta, scratch)
+    _regress(extended_delta, window, out[:, 2 * n_coefficient :], scratch)
+    out[:, n_coefficient : 2 * n_coefficient] = extended_delta[window : window + n_row]
+    return out
+
+
+def derive_cepstrum_regression_velocities(
+    cepstra: NDArray[np.float32],
+    window=DEFAULT_VELOCITY_WINDOW,
+    out: NDArray[np.float32] | None = None,
+) -> NDArray[np.float32]:
+    """Derive the delta and delta delta of `cepstra` over time by linear
+    regression over `window` frames on each side, repeating the first and last
+    frame at the edges, unlike `derive_cepstrum_velocities`, which takes them
+    across the coefficients of each frame. The cepstra, deltas and delta deltas
+    are written into `out` of shape (T, 3·D) if given."""
+    cepstra = np.atleast_2d(cepstra)
+    n_frame, n_coefficient = cepstra.shape
+    if out is None:
+        out = np.empty((n_frame, 3 * n_coefficient), dtype=cepstra.dtype)
+    streaming = StreamingRegressionVelocities(
+        n_coefficient, window, cepstra.dtype.type, block_capacity=n_frame
+    )
+    n_streamed = len(streaming.add_cepstra(cepstra, out))
+    streaming.finish(out[n_streamed:])
+    return out
+
+
+class StreamingRegressionVelocities:
+    """Derive `derive_cepstrum_regression_velocities` as cepstra arrive,
+    carrying the frames still needed as context between blocks. Each frame's
+    features are final once `2 × window` later frames have arrived, or when
+    the stream finishes. The frames and work space live in buffers allocated
+    once for blocks of up to `block_capacity` frames, and only grow if a
+    larger block arrives."""
+
+    def __init__(
+        self,
+        n_coefficient=N_MFCC_COEFFICIENTS,
+        window=DEFAULT_VELOCITY_WINDOW,
+        dtype: type[np.floating] = FEATURE_DTYPE,
+        block_capacity=64,
+    ):
+        self.n_coefficient = n_coefficient
+        self.window = window
+        self.dtype = dtype
+        self.buffer = np.empty((4 * window + block_capacity, n_coefficient), dtype)
+        """`2 × window` frames of past context followed by the frames whose
+        features are not final yet, in the first `n_buffered` rows."""
+        self.n_buffered = 0
+        self.extended_delta = np.empty(
+            (len(self.buffer) - 2 * window, n_coefficient), dtype
+        )
+        """Work space for the deltas, including those of the context frames."""
+        self.scratch = np.empty_like(self.extended_delta)
+
+    def _reserve(self, n_row: int):
+        """Make `buffer` hold at least `n_row` frames."""
+        if n_row <= len(self.buffer):
+            return
+        capacity = max(n_row, 2 * len(self.buffer))
+        buffer = np.empty((capacity, self.n_coefficient), self.dtype)
+        buffer[: self.n_buffered] = self.buffer[: self.n_buffered]
+        self.buffer = buffer
+        self.extended_delta = np.empty(
+            (capacity - 2 * self.window, self.n_coefficient), self.dtype
+        )
+        self.scratch = np.empty_like(self.extended_delta)
+
+    def _empty(self, out: NDArray[np.float32] | None) -> NDArray[np.float32]:
+        if out is not None:
+            return out[:0]
+        return np.empty((0, 3 * self.n_coefficient), dtype=self.dtype)
+
+    def _features(
+        self, n_ready: int, out: NDArray[np.float32] | None
+    ) -> NDArray[np.float32]:
+        if out is None:
+            out = np.empty((n_ready, 3 * self.n_coefficient), dtype=self.dtype)
+        n_extended = n_ready + 2 * self.window
+        _regression_velocities_from_padded(
+            self.buffer[: n_ready + 4 * self.window],
+            self.window,
+            out[:n_ready],
+            self.extended_delta[:n_extended],
+            self.scratch[:n_extended],
+        )
+        self.n_buffered -= n_ready
+        self.buffer[: self.n_buffered] = self.buffer[
+            n_ready : n_ready + self.n_buffered
+        ]
+        return out[:n_ready]
+
+    def add_cepstra(
+        self, cepstra: NDArray[np.float32], out: NDArray[np.float32] | None = None
+    ) -> NDArray[np.float32]:
+        """Add the next cepstra, each row a frame, and return the features of
+        the frames that became final, each row a frame, written into the first
+        rows of `out` if given. `out` needs a row for each added frame."""
+        cepstra = np.atleast_2d(cepstra)
+        if self.n_buffered == 0 and len(cepstra) > 0:
+            self.buffer[: 2 * self.window] = cepstra[0]
+            self.n_buffered = 2 * self.window
+        self._reserve(self.n_buffered + len(cepstra))
+        self.buffer[self.n_buffered : self.n_buffered + len(cepstra)] = cepstra
+        self.n_buffered += len(cepstra)
+        n_ready = self.n_buffered - 4 * self.window
+        if n_ready <= 0:
+            return self._empty(out)
+        return self._features(n_ready, out)
+
+    def finish(self, out: NDArray[np.float32] | None = None) -> NDArray[np.float32]:
+        """Return the features of the remaining frames, each row a frame,
+        written into `out` if given."""
+        n_ready = self.n_buffered - 2 * self.window
+        if n_ready <= 0:
+            self.n_buffered = 0
+            return self._empty(out)
+        self._reserve(self.n_buffered + 2 * self.window)
+        self.buffer[self.n_buffered : self.n_buffered + 2 * self.window] = self.buffer[
+            self.n_buffered - 1
+        ]
+        self.n_buffered += 2 * self.window
+        features = self._features(n_ready, out)
+        self.n_buffered = 0
+        return features
 
 
 def normalize_cepstrum(cepstrum: NDArray[np.float32]) -> NDArray[np.float32]:
@@ -310,11 +693,188 @@ def normalize_cepstrum(cepstrum: NDArray[np.float32]) -> NDArray[np.float32]:
     return cepstrum
 
 
+@dataclass
+class CMVNStats:
+    """Accumulated statistics for cepstral mean and variance normalization,
+    e.g., over all utterances of a speaker."""
+
+    n: int
+    sum: DoubleArray
+    sum_square: DoubleArray
+
+    @classmethod
+    def zeros(cls, n_features: int):
+        return cls(0, np.zeros(n_features), np.zeros(n_features))
+
+    def accumulate(self, features: NDArray[np.floating]):
+        """Add `features`, each row a frame."""
+        features = np.atleast_2d(features)
+        self.n += len(features)
+        self.sum += np.sum(features, axis=0, dtype=np.float64)
+        self.sum_square += np.einsum("ij,ij->j", features, features, dtype=np.float64)
+
+    @property
+    def mean(self) -> DoubleArray:
+        return self.sum / max(self.n, 1)
+
+    @property
+    def variance(self) -> DoubleArray:
+        return np.maximum(self.sum_square / max(self.n, 1) - np.square(self.mean), 0)
+
+    def normalize(self, features: NDArray[np.floating]) -> NDArray[np.floating]:
+        """`features` normalized to 0 mean and 1 standard deviation per the
+        accumulated statistics, in the same type."""
+        variance = self.variance
+        normalized = (features - self.mean).astype(features.dtype)
+        np.divide(
+            normalized,
+            np.sqrt(variance).astype(features.dtype),
+            out=normalized,
+            where=variance > 0,
+        )
+        return normalized
+
+
+def save_cmvn_stats(file_name: str, stats_by_speaker: dict[str, CMVNStats]):
+    """Save the CMVN statistics of each speaker to `file_name` as `.npz`."""
+    speakers = list(stats_by_speaker)
+    np.savez(
+        file_name,
+        speakers=np.array(speakers, dtype=str),
+        n=np.array([stats_by_speaker[s].n for s in speakers], dtype=np.int64),
+        sum=np.array([stats_by_speaker[s].sum for s in speakers]),
+        sum_square=np.array([stats_by_speaker[s].sum_square for s in speakers]),
+    )
+
+
+def load_cmvn_stats(file_name: str) -> dict[str, CMVNStats]:
+    """Load the CMVN statistics of each speaker saved by `save_cmvn_stats`."""
+    with np.load(file_name) as stats_file:
+        return {
+            str(speaker): CMVNStats(int(n), sum_, sum_square)
+            for speaker, n, sum_, sum_square in zip(
+                stats_file["speakers"],
+                stats_file["n"],
+                stats_file["sum"],
+                stats_file["sum_square"],
+            )
+        }
+
+
+DEFAULT_CMVN_WINDOW = 600
+"""Default number of frames sliding-window CMVN normalizes over: 6 seconds."""
+
+
+class SlidingWindowCMVN:
+    """Normalize features as they arrive to have 0 mean and 1 standard
+    deviation over the last `window` frames up to and including each frame.
+    Until `window` frames have arrived, the missing frames are filled in with
+    the `prior` statistics if given, e.g., the speaker's `CMVNStats`, so the
+    first frames are normalized stably. Running sums over the last
+    `window - 1` frames are kept, and the frames that will leave the window are
+    kept in a ring, so normalizing a block of frames costs time in proportion
+    to the block, without a Python loop over the frames."""
+
+    def __init__(
+        self,
+        n_features: int,
+        window=DEFAULT_CMVN_WINDOW,
+        prior: CMVNStats | None = None,
+    ):
+        self.window = window
+        self.prior = prior
+        self.sum = np.zeros(n_features)
+        """Sum of the last up to `window - 1` frames."""
+        self.sum_square = np.zeros(n_features)
+        """Sum of the squares of the last up to `window - 1` frames."""
+        self.ring: DoubleArray = np.empty((0, n_features))
+        """The last up to `window - 1` frames, oldest at `ring_start`. Grows
+        until it holds `window - 1` frames, then wraps around."""
+        self.ring_start = 0
+        self.n_history = 0
+        """Number of frames in `ring`."""
+
+    def normalize(self, features: NDArray[np.floating]) -> NDArray[np.floating]:
+        """Normalize `features`, each row a frame following the frames
+        previously normalized. Returns an array in the same type."""
+        features = np.atleast_2d(features)
+        n_feature = len(features)
+        frames = features.astype(np.float64, copy=False)
+        cumulative_sums = np.zeros((n_feature + 1, frames.shape[1]))
+        np.cumsum(frames, axis=0, out=cumulative_sums[1:])
+        cumulative_square_sums = np.zeros_like(cumulative_sums)
+        np.cumsum(np.square(frames), axis=0, out=cumulative_square_sums[1:])
+
+        # Frames leave the window oldest first: the history, then `frames`.
+        n_leaving = max(self.n_history + n_feature - (self.window - 1), 0)
+        n_leaving_history = min(self.n_history, n_leaving)
+        leaving = np.vstack(
+            (self._oldest(n_leaving_history), frames[: n_leaving - n_leaving_history])
+        )
+        leaving_sums = np.zeros((n_leaving + 1, frames.shape[1]))
+        np.cumsum(leaving, axis=0, out=leaving_sums[1:])
+        leaving_square_sums = np.zeros_like(leaving_sums)
+        np.cumsum(np.square(leaving), axis=0, out=leaving_square_sums[1:])
+
+        ends = np.arange(1, n_feature + 1)
+        n_left = np.maximum(self.n_history + ends - self.window, 0)
+        sums = self.sum + cumulative_sums[1:] - leaving_sums[n_left]
+        square_sums = (
+            self.sum_square + cumulative_square_sums[1:] - leaving_square_sums[n_left]
+        )
+        counts = (self.n_history + ends - n_left)[:, np.newaxis].astype(np.float64)
+        if self.prior is not None and self.prior.n > 0:
+            n_missing = self.window - counts
+            sums += n_missing * self.prior.mean
+            square_sums += n_missing * (
+                self.prior.variance + np.square(self.prior.mean)
+            )
+            counts += n_missing
+
+        means = sums / counts
+        variances = np.maximum(square_sums / counts - np.square(means), 0)
+        normalized = features - means
+        np.divide(normalized, np.sqrt(variances), out=normalized, where=variances > 0)
+
+        self.sum += cumulative_sums[-1] - leaving_sums[-1]
+        self.sum_square += cumulative_square_sums[-1] - leaving_square_sums[-1]
+        self._remember(frames, n_leaving_history)
+        return normalized.astype(features.dtype, copy=False)
+
+    def _oldest(self, n: int) -> DoubleArray:
+        """The oldest `n` frames in `ring`."""
+        return self.ring[(self.ring_start + np.arange(n)) % max(len(self.ring), 1)]
+
+    def _remember(self, frames: DoubleArray, n_forget: int):
+        """Forget the oldest `n_forget` frames in `ring` and add the last of
+        `frames` that stay in the window."""
+        frames = frames[len(frames) - min(len(frames), self.window - 1) :]
+        n_history = self.n_history - n_forget + len(frames)
+        if n_history > len(self.ring):
+            # The ring has not wrapped around yet, so its frames start at 0.
+            capacity = min(max(n_history, 2 * len(self.ring)), self.window - 1)
+            ring = np.empty((capacity, self.ring.shape[1]))
+            ring[: self.n_history] = self.ring[: self.n_history]
+            self.ring = ring
+        if len(self.ring) == 0:
+            return
+        self.ring_start = (self.ring_start + n_forget) % len(self.ring)
+        positions = self.ring_start + self.n_history - n_forget + np.arange(len(frames))
+        self.ring[positions % len(self.ring)] = frames
+        self.n_history = n_history
+
+
 class RunningMFCC:
-    def __init__(self, n_filter_banks=40, n_mfcc_coefficients=N_MFCC_COEFFICIENTS):
+    def __init__(
+        self,
+        n_filter_banks=40,
+        n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+        dtype: type[np.floating] = FEATURE_DTYPE,
+    ):
         self.n_filter_banks = n_filter_banks
         self.n_mfcc_coefficients = n_mfcc_coefficients
-        self.segmenter = Segmenter(SAMPLING_RATE * CHUNK_MS // MS_IN_SECOND)
+        self.dtype = dtype
+        self.segmenter = Segmenter()
         self.mel_spectra = []
         self.cepstra = []
         self.running_mean_variance = RunningMeanVariance(n_mfcc_coefficients)
@@ -322,40 +882,85 @@ class RunningMFCC:
     def add_sample(self, sample: NDArray[np.float32]):
         """The Mel spectra and cepstra returned have each row corresponding to
         each segment."""
-        mel_spectra = []
-        cepstra = []
         self.segmenter.add_sample(pre_emphasis(sample))
-        while (frame := self.segmenter.next()) is not None:
-            mel_spectrum, cepstrum = mel_spectrum_and_cepstrum_from_frame(
-                frame, self.n_filter_banks, self.n_mfcc_coefficients
-            )
-            cepstrum = self.running_mean_variance.normalize_and_update(cepstrum)
-            mel_spectra.append(mel_spectrum)
-            cepstra.append(cepstrum)
+        frames = self.segmenter.frames()
+        if len(frames) == 0:
+            return np.atleast_2d(np.asarray([])), np.atleast_2d(np.asarray([]))
+        mel_spectra, cepstra = mel_spectra_and_cepstra_from_frames(
+            frames, self.n_filter_banks, self.n_mfcc_coefficients, self.dtype
+        )
+        self.running_mean_variance.normalize_and_update_block(cepstra)
         self.mel_spectra.extend(mel_spectra)
         self.cepstra.extend(cepstra)
-        return np.atleast_2d(np.asarray(cepstra)), np.atleast_2d(
-            np.asarray(mel_spectra)
+        return cepstra, mel_spectra
+
+
+class StreamingBoostedMFCC:
+    """Derive boosted MFCC features, i.e., cepstra with their deltas and delta
+    deltas, as audio arrives. The features match those of
+    `derive_cepstrum_velocities(mfcc_homebrew(audio_array)[0])` on the whole
+    audio. Since the velocities are taken across the coefficients of each
+    frame, each frame's features are final as soon as the frame arrives.
+    Features are in `dtype`."""
+
+    def __init__(
+        self,
+        n_filter_banks=40,
+        n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+        dtype: type[np.floating] = FEATURE_DTYPE,
+    ):
+        self.n_filter_banks = n_filter_banks
+        self.n_mfcc_coefficients = n_mfcc_coefficients
+        self.dtype = dtype
+        self.segmenter = Segmenter()
+        self.last_sample: float | None = None
+
+    def add_sample(self, audio_array: NDArray) -> NDArray[np.float32]:
+        """Add the next piece of audio. The features returned have each row
+        corresponding to each new frame."""
+        self.segmenter.add_sample(pre_emphasis(audio_array, previous=self.last_sample))
+        if len(audio_array) > 0:
+            self.last_sample = audio_array[-1]
+        frames = self.segmenter.frames()
+        if len(frames) == 0:
+            return np.empty((0, 3 * self.n_mfcc_coefficients), dtype=self.dtype)
+        _, cepstra = mel_spectra_and_cepstra_from_frames(
+            frames, self.n_filter_banks, self.n_mfcc_coefficients, self.dtype
         )
+        return np.atleast_2d(derive_cepstrum_velocities(cepstra))
 
 
 def mfcc_homebrew(
-    audio_array: NDArray, n_filter_banks=40, n_mfcc_coefficients=N_MFCC_COEFFICIENTS
+    audio_array: NDArray,
+    n_filter_banks=40,
+    n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+    dtype: type[np.floating] = FEATURE_DTYPE,
 ):
     """The Mel spectra and cepstra returned have each row corresponding to each
-    segment."""
-    segmenter = Segmenter(SAMPLING_RATE * CHUNK_MS // MS_IN_SECOND)
-    segmenter.add_sample(pre_emphasis(audio_array))
-    mel_spectra = []
-    cepstra = []
-    while (frame := segmenter.next()) is not None:
-        mel_spectrum, cepstrum = mel_spectrum_and_cepstrum_from_frame(
-            frame, n_filter_banks, n_mfcc_coefficients
-        )
-        mel_spectra.append(mel_spectrum)
-        cepstra.append(cepstrum)
-    mel_spectra_np = np.asarray(mel_spectra)
-    return np.asarray(cepstra), normalize_cepstrum(mel_spectra_np)
+    segment, in `dtype`."""
+    frames = frames_from_signal(pre_emphasis(audio_array))
+    mel_spectra, cepstra = mel_spectra_and_cepstra_from_frames(
+        frames, n_filter_banks, n_mfcc_coefficients, dtype
+    )
+    return cepstra, normalize_cepstrum(mel_spectra)
+
+
+def mfcc_for_banks(
+    audio_array: NDArray,
+    ns_filter_banks: tuple[int, ...],
+    n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+    dtype: type[np.floating] = FEATURE_DTYPE,
+):
+    """Like `mfcc_homebrew` for each number of filter banks in
+    `ns_filter_banks`, sharing one FFT per frame."""
+    frames = frames_from_signal(pre_emphasis(audio_array))
+    fft_size, power_spectra = power_spectra_from_frames(frames, dtype)
+    results = []
+    for mel_spectra in mel_spectra_for_banks(fft_size, power_spectra, ns_filter_banks):
+        dctm = dct_matrix(mel_spectra.shape[1], n_mfcc_coefficients, dtype)
+        cepstra = np.log(mel_spectra) @ dctm.T
+        results.append((cepstra, normalize_cepstrum(mel_spectra)))
+    return results
 
 
 def mfcc(audio_array: NDArray, sr=8000):
@@ -405,7 +1010,20 @@ def plot_cepstra(ceptra_matrix: NDArray[np.float32], title="Mel Cepstrum") -> Fi
     return fig
 
 
+@lru_cache(maxsize=8)
+def lifter_weights(
+    ncep: int, lift: float, dtype: type[np.floating] = np.float64
+) -> NDArray[np.floating]:
+    """Read-only weights in `dtype` of each of `ncep` cepstral coefficients
+    for liftering."""
+    liftwts = np.concatenate(([1], np.arange(1, ncep) ** lift)).astype(dtype)
+    liftwts.setflags(write=False)
+    return liftwts
+
+
 def lifting(cepstra, lift=0.6):
-    liftwts = np.concatenate(([1], np.arange(1, cepstra.shape[0]) ** lift))
-    y = np.diag(liftwts) @ cepstra
-    return y
+    """Lifter `cepstra`, each column a frame, by scaling each row, keeping
+    `np.float32` cepstra in `np.float32`."""
+    dtype = np.result_type(cepstra, np.float32).type
+    liftwts = lifter_weights(cepstra.shape[0], lift, dtype)
+    return (liftwts * cepstra.T).T
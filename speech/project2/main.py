@@ -5,11 +5,12 @@ import os
 
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
+from numpy.typing import NDArray
 
 from speech.project2 import read_audio_file
 from speech.project2.lib import (
     cep2spec,
-    mfcc_homebrew,
+    mfcc_for_banks,
     plot_cepstra,
     plot_log_mel_spectra,
 )
@@ -33,14 +34,19 @@ NUMBERS = (
 NS_FILTER_BANKS = (40, 30, 25)
 
 
-def plot_audio_file(number: str, i: int, n_filter_banks: int):
+def plot_audio_file(number: str, i: int):
     file_name = f"recordings/{number}{i}.wav"
-    print(f"Working on {file_name} using {n_filter_banks} filter banks.")
+    print(f"Working on {file_name} using {NS_FILTER_BANKS} filter banks.")
     audio_array = read_audio_file(file_name)
+    for (cep, mspec), n_filter_banks in zip(
+        mfcc_for_banks(audio_array, NS_FILTER_BANKS), NS_FILTER_BANKS
+    ):
+        plot_mfcc(number, i, n_filter_banks, cep, mspec)
 
+
+def plot_mfcc(number: str, i: int, n_filter_banks: int, cep: NDArray, mspec: NDArray):
     dir_name = f"project2_plot/{number}/"
     os.makedirs(dir_name, exist_ok=True)
-    cep, mspec = mfcc_homebrew(audio_array=audio_array, n_filter_banks=n_filter_banks)
 
     log_spec_file_name = f"{dir_name}{number}{i}log_spectra{n_filter_banks}.png"
     title = f"Log Mel Spectrum of `{number}`\n(#{i}, {n_filter_banks} Filter Banks)"
@@ -62,9 +68,7 @@ def plot_audio_file(number: str, i: int, n_filter_banks: int):
 def main():
     for number in NUMBERS:
         for i in range(4):
-            for n_filter_banks in NS_FILTER_BANKS:
-                plot_audio_file(number, i, n_filter_banks)
-                plt.close("all")
+            plot_audio_file(number, i)
 
 
 main() if __name__ == "__main__" else None
@@ -0,0 +1,52 @@
+"""Derive boosted MFCC features from endpointed speech as it arrives, from the
+microphone recorder's byte queue or from a capture server stream."""
+
+from queue import Queue
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+
+from speech import T
+from speech.project1.capture_server import SpeechConsumer
+from speech.project2.lib import StreamingBoostedMFCC
+
+
+class BoostedMFCCConsumer(SpeechConsumer[T]):
+    """Derive boosted MFCC features from a stream's speech as it arrives, and
+    pass them to `recognize` once speech stops."""
+
+    def __init__(self, recognize: Callable[[NDArray[np.float32]], T]):
+        self.recognize = recognize
+        self.streaming_mfcc = StreamingBoostedMFCC()
+        self.features: list[NDArray[np.float32]] = []
+
+    def add_sample(self, audio_array: NDArray[np.int16]):
+        self.features.append(self.streaming_mfcc.add_sample(audio_array))
+
+    def finish(self) -> T:
+        return self.recognize(concatenate_features(self.streaming_mfcc, self.features))
+
+
+def boosted_mfcc_from_byte_queue(
+    byte_queue: Queue[bytes | None],
+) -> NDArray[np.float32]:
+    """Derive boosted MFCC features from audio data in `byte_queue` as it
+    arrives until `None` is received. No features are derived if `None`
+    arrives before any speech."""
+    streaming_mfcc = StreamingBoostedMFCC()
+    features = []
+    while (data := byte_queue.get()) is not None:
+        features.append(streaming_mfcc.add_sample(np.frombuffer(data, dtype=np.int16)))
+    return concatenate_features(streaming_mfcc, features)
+
+
+def concatenate_features(
+    streaming_mfcc: StreamingBoostedMFCC, features: list[NDArray[np.float32]]
+) -> NDArray[np.float32]:
+    """Concatenate `features` from `streaming_mfcc`, which may be none."""
+    if len(features) == 0:
+        return np.empty(
+            (0, 3 * streaming_mfcc.n_mfcc_coefficients), dtype=streaming_mfcc.dtype
+        )
+    return np.concatenate(features)
@@ -0,0 +1,195 @@
+"""Run with `python3 -m speech.project2.test`."""
+
+import os
+import tempfile
+import unittest
+from queue import Queue
+
+import numpy as np
+
+from speech.project2 import read_audio_file
+from speech.project2.lib import (
+    CMVNStats,
+    MultiBankMelSpectra,
+    RunningMeanVariance,
+    Segmenter,
+    SlidingWindowCMVN,
+    StreamingBoostedMFCC,
+    StreamingRegressionVelocities,
+    derive_cepstrum_regression_velocities,
+    derive_cepstrum_velocities,
+    frames_from_signal,
+    load_cmvn_stats,
+    mel_spectrum_and_cepstrum_from_frame,
+    mfcc_for_banks,
+    mfcc_homebrew,
+    pre_emphasis,
+    save_cmvn_stats,
+)
+from speech.project2.streaming import boosted_mfcc_from_byte_queue
+
+
+class TestMFCC(unittest.TestCase):
+    def test_batch_mfcc(self):
+        pre_emphasized = pre_emphasis(read_audio_file("recordings/one10.wav"))
+        segmenter = Segmenter(320)
+        segmenter.add_sample(pre_emphasized)
+        expected_cepstra = []
+        while (frame := segmenter.next()) is not None:
+            _, cepstrum = mel_spectrum_and_cepstrum_from_frame(frame, 40)
+            expected_cepstra.append(cepstrum)
+        audio_array = read_audio_file("recordings/one10.wav")
+        cepstra, _ = mfcc_homebrew(audio_array, dtype=np.float64)
+        np.testing.assert_allclose(cepstra, expected_cepstra, rtol=1e-6, atol=1e-6)
+        cepstra, mel_spectra = mfcc_homebrew(audio_array)
+        self.assertEqual(cepstra.dtype, np.float32)
+        self.assertEqual(mel_spectra.dtype, np.float32)
+        np.testing.assert_allclose(cepstra, expected_cepstra, rtol=1e-4, atol=1e-4)
+
+    def test_segmenter(self):
+        signal = np.arange(5000, dtype=np.float32)
+        segmenter = Segmenter(320)
+        frames = []
+        for start, stop in zip((0, 7, 900, 901, 3000), (7, 900, 901, 3000, 5000)):
+            segmenter.add_sample(signal[start:stop])
+            if (frame := segmenter.next()) is not None:
+                frames.append(frame.copy())
+            frames.extend(segmenter.frames().copy())
+        np.testing.assert_array_equal(frames, frames_from_signal(signal, 320))
+
+    def test_streaming_boosted_mfcc(self):
+        audio_array = read_audio_file("recordings/one10.wav")
+        streaming_mfcc = StreamingBoostedMFCC()
+        rng = np.random.default_rng(0)
+        ends = np.sort(rng.integers(0, len(audio_array), 40))
+        features = [
+            streaming_mfcc.add_sample(chunk) for chunk in np.split(audio_array, ends)
+        ]
+        expected = derive_cepstrum_velocities(mfcc_homebrew(audio_array)[0])
+        np.testing.assert_allclose(
+            np.concatenate(features), expected, rtol=1e-4, atol=1e-4
+        )
+
+        byte_queue: Queue[bytes | None] = Queue()
+        byte_queue.put(None)
+        self.assertEqual(boosted_mfcc_from_byte_queue(byte_queue).shape, (0, 39))
+
+    def test_multi_bank_mfcc(self):
+        audio_array = read_audio_file("recordings/one10.wav")
+        ns_bank = (40, 30, 25)
+        multi_bank_mel_spectra = MultiBankMelSpectra(ns_bank, capacity=1)
+        segmenter = Segmenter(320)
+        for start in range(0, len(audio_array), 320):
+            segmenter.add_sample(pre_emphasis(audio_array[start : start + 320]))
+            multi_bank_mel_spectra.add_frames(segmenter.frames())
+        for n_bank, (cepstra, _), mel_spectra in zip(
+            ns_bank,
+            mfcc_for_banks(audio_array, ns_bank),
+            multi_bank_mel_spectra.mel_spectra(),
+        ):
+            expected_cepstra, _ = mfcc_homebrew(audio_array, n_bank)
+            np.testing.assert_allclose(cepstra, expected_cepstra, rtol=1e-5)
+            self.assertEqual(mel_spectra.shape, (len(cepstra), n_bank))
+
+
+class TestCMVN(unittest.TestCase):
+    def setUp(self):
+        self.cepstra, _ = mfcc_homebrew(read_audio_file("recordings/one10.wav"))
+
+    def test_running_mean_variance_block(self):
+        expected = self.cepstra.copy()
+        running_mean_variance = RunningMeanVariance(13)
+        for cepstrum in expected:
+            mean = (running_mean_variance.n * running_mean_variance.mean + cepstrum) / (
+                running_mean_variance.n + 1
+            )
+            cepstrum -= mean
+            variance = (
+                running_mean_variance.n * running_mean_variance.variance
+                + np.square(cepstrum)
+            ) / (running_mean_variance.n + 1)
+            np.divide(cepstrum, np.sqrt(variance), out=cepstrum, where=variance > 0)
+            running_mean_variance.mean = mean
+            running_mean_variance.variance = variance
+            running_mean_variance.n += 1
+        running_mean_variance = RunningMeanVariance(13)
+        cepstra = self.cepstra.copy()
+        for start in range(0, len(cepstra), 7):
+            running_mean_variance.normalize_and_update_block(cepstra[start : start + 7])
+        np.testing.assert_allclose(cepstra, expected, rtol=1e-4, atol=1e-4)
+
+    def test_sliding_window_cmvn(self):
+        window = 20
+        expected = [
+            (frame - self.cepstra[max(t - window + 1, 0) : t + 1].mean(axis=0))
+            / self.cepstra[max(t - window + 1, 0) : t + 1].std(axis=0)
+            for t, frame in enumerate(self.cepstra[1:], 1)
+        ]
+        for block_size in (1, 9, 50):
+            cmvn = SlidingWindowCMVN(13, window)
+            normalized = [cmvn.normalize(self.cepstra[:1])]
+            for start in range(1, len(self.cepstra), block_size):
+                block = self.cepstra[start : start + block_size]
+                normalized.append(cmvn.normalize(block))
+            np.testing.assert_allclose(
+                np.vstack(normalized)[1:], expected, rtol=1e-3, atol=1e-3
+            )
+
+    def test_cmvn_stats(self):
+        stats = CMVNStats.zeros(13)
+        stats.accumulate(self.cepstra[:50])
+        stats.accumulate(self.cepstra[50:])
+        np.testing.assert_allclose(stats.mean, self.cepstra.mean(axis=0), rtol=1e-5)
+        np.testing.assert_allclose(
+            stats.normalize(self.cepstra).std(axis=0), 1, rtol=1e-4
+        )
+        with tempfile.TemporaryDirectory() as dir_name:
+            file_name = os.path.join(dir_name, "cmvn.npz")
+            save_cmvn_stats(file_name, {"speaker": stats})
+            loaded = load_cmvn_stats(file_name)["speaker"]
+        self.assertEqual(loaded.n, stats.n)
+        np.testing.assert_array_equal(loaded.sum_square, stats.sum_square)
+        cmvn = SlidingWindowCMVN(13, window=1_000_000, prior=loaded)
+        np.testing.assert_allclose(
+            cmvn.normalize(self.cepstra[:1]),
+            stats.normalize(self.cepstra[:1]),
+            rtol=1e-4,
+            atol=1e-4,
+        )
+
+
+class TestVelocities(unittest.TestCase):
+    def test_velocities(self):
+        cepstra, _ = mfcc_homebrew(read_audio_file("recordings/one10.wav"))
+        padded = np.pad(cepstra, ((0, 0), (1, 1)), mode="edge")
+        delta = padded[:, 2:] - padded[:, :-2]
+        padded_delta = np.pad(delta, ((0, 0), (1, 1)), mode="edge")
+        expected = np.hstack(
+            (cepstra, delta, padded_delta[:, 2:] - padded_delta[:, :-2])
+        )
+        out = np.empty_like(expected)
+        np.testing.assert_array_equal(
+            derive_cepstrum_velocities(cepstra, out), expected
+        )
+
+    def test_regression_velocities(self):
+        ramp = np.arange(20, dtype=np.float64)[:, np.newaxis].repeat(3, axis=1)
+        features = derive_cepstrum_regression_velocities(ramp, window=2)
+        np.testing.assert_allclose(features[4:-4, 3:6], 1)
+        np.testing.assert_allclose(features[4:-4, 6:], 0)
+
+        cepstra, _ = mfcc_homebrew(read_audio_file("recordings/one10.wav"))
+        expected = derive_cepstrum_regression_velocities(cepstra, 3)
+        out = np.empty_like(expected)
+        self.assertIs(derive_cepstrum_regression_velocities(cepstra, 3, out), out)
+        np.testing.assert_array_equal(out, expected)
+        # A capacity below the block size makes the buffers grow.
+        streaming = StreamingRegressionVelocities(window=3, block_capacity=2)
+        streamed = [streaming.add_cepstra(cepstra[:1])]
+        for start in range(1, len(cepstra), 5):
+            streamed.append(streaming.add_cepstra(cepstra[start : start + 5]))
+        streamed.append(streaming.finish())
+        np.testing.assert_array_equal(np.vstack(streamed), expected)
+
+
+unittest.main() if __name__ == "__main__" else None
@@ -1,16 +1,26 @@
+import shutil
+import tempfile
 from abc import ABC
+from functools import lru_cache
 from logging import debug
+from typing import Callable
 
 import numpy as np
-from cache_to_disk import cache_to_disk
+import scipy
 from numpy.typing import NDArray
 
+from speech.project1 import SAMPLING_RATE
 from speech.project2 import read_audio_file
 from speech.project2.lib import (
+    FEATURE_DTYPE,
+    FRONT_END_VERSION,
+    N_FRAME_WINDOW,
     N_MFCC_COEFFICIENTS,
+    PRE_EMPHASIS_ALPHA,
     derive_cepstrum_velocities,
     mfcc_homebrew,
 )
+from speech.project3.feature_cache import FeatureCache, config_hash
 
 TEST_INDEXES = range(11, 20, 2)
 """Indexes for test numbers."""
@@ -37,13 +47,74 @@ class NodeCostFn(ABC):
     ) -> np.float32:
         raise NotImplementedError(input_frame, template_frame_index)
 
+    def column(
+        self, input_frame: NDArray[np.float32], template_len: int
+    ) -> NDArray[np.float32]:
+        """Node costs of `input_frame` against every template frame."""
+        return np.array(
+            [self(input_frame, index) for index in range(template_len)],
+            dtype=np.float32,
+        )
+
+
+FEATURE_CACHE = FeatureCache()
+"""Cache of `boosted_mfcc_from_file`."""
+
+
+@lru_cache
+def boosted_mfcc_config_hash(n_filter_banks: int, n_mfcc_coefficients: int) -> str:
+    """Hash of everything `calculate_boosted_mfcc` depends on besides the
+    audio: the front-end configuration and algorithm version, and the NumPy
+    and SciPy versions."""
+    return config_hash(
+        {
+            "front_end_version": FRONT_END_VERSION,
+            "sampling_rate": SAMPLING_RATE,
+            "pre_emphasis_alpha": PRE_EMPHASIS_ALPHA,
+            "window": "hanning",
+            "frame_size": N_FRAME_WINDOW,
+            "hop_size": N_FRAME_WINDOW // 2,
+            "n_filter_banks": n_filter_banks,
+            "n_mfcc_coefficients": n_mfcc_coefficients,
+            "dtype": np.dtype(FEATURE_DTYPE).name,
+        },
+        np.__version__,
+        scipy.__version__,
+    )
+
+
+def use_temporary_feature_cache() -> Callable[[], None]:
+    """Cache `boosted_mfcc_from_file` in a new temporary directory instead of
+    `FEATURE_CACHE`'s, e.g., in tests. Return a function that restores
+    `FEATURE_CACHE` and removes the temporary directory."""
+    global FEATURE_CACHE
+    feature_cache = FEATURE_CACHE
+    FEATURE_CACHE = FeatureCache(tempfile.mkdtemp())
+
+    def restore():
+        global FEATURE_CACHE
+        shutil.rmtree(FEATURE_CACHE.cache_dir, ignore_errors=True)
+        FEATURE_CACHE = feature_cache
+
+    return restore
+
 
-@cache_to_disk(30)
 def boosted_mfcc_from_file(
     file_name: str, n_filter_banks=40, n_mfcc_coefficients=N_MFCC_COEFFICIENTS
 ):
     """Get the boosted MFCC features from `file_name`. Each column should have
-    `n_mfcc_coefficients` × 3 values."""
+    `n_mfcc_coefficients` × 3 values. Cached in `FEATURE_CACHE`."""
+    return FEATURE_CACHE.get_or_compute(
+        file_name,
+        boosted_mfcc_config_hash(n_filter_banks, n_mfcc_coefficients),
+        lambda: calculate_boosted_mfcc(file_name, n_filter_banks, n_mfcc_coefficients),
+    )
+
+
+def calculate_boosted_mfcc(
+    file_name: str, n_filter_banks=40, n_mfcc_coefficients=N_MFCC_COEFFICIENTS
+):
+    """Calculate `boosted_mfcc_from_file` without caching."""
     debug(f"Calculating the boosted MFCC from audio file {file_name}.")
     audio_array = read_audio_file(file_name)
     cepstra, _ = mfcc_homebrew(audio_array, n_filter_banks, n_mfcc_coefficients)
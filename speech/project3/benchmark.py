@@ -0,0 +1,120 @@
+"""Measure endpointing and time-synchronous DTW recognition throughput on
+replayed or synthetic audio, without a sound card.
+Run as `python3 -m speech.project3.benchmark`."""
+
+import argparse
+from queue import Queue
+from time import perf_counter
+
+import numpy as np
+
+from speech.project1 import SAMPLING_RATE
+from speech.project1.audio_in import (
+    GeneratedAudioIn,
+    LoopingAudioIn,
+    SyntheticAudioIn,
+)
+from speech.project1.endpoint import Endpointer, EndpointerStats
+from speech.project2.lib import derive_cepstrum_velocities, mfcc_homebrew
+from speech.project2.main import NUMBERS
+from speech.project3 import TEST_INDEXES, boosted_mfcc_from_file
+from speech.project3.dtw import PackedTemplates, time_sync_dtw_search
+
+SILENCE_FILE_NAMES = ("recordings/silence0.wav", "recordings/silence1.wav")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Endpointing and DTW benchmark")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="WAV files to replay. Defaults to the test recordings.",
+    )
+    parser.add_argument(
+        "-n", "--n-loop", default=1, type=int, help="Number of times to replay."
+    )
+    parser.add_argument(
+        "-s",
+        "--synthetic-ms",
+        type=int,
+        help="Benchmark on this many milliseconds of synthetic audio instead.",
+    )
+    parser.add_argument(
+        "-r", "--realtime", action="store_true", help="Pace audio in real time."
+    )
+    parser.add_argument(
+        "-e", "--endpoint-only", action="store_true", help="Skip recognition."
+    )
+    args = parser.parse_args()
+
+    template_mfcc_s = PackedTemplates(
+        (boosted_mfcc_from_file(f"recordings/{number}10.wav"), number)
+        for number in NUMBERS
+    )
+    # Separate the test recordings with silence so they endpoint separately.
+    file_names = args.files or [
+        file_name
+        for number in NUMBERS
+        for i in TEST_INDEXES
+        for file_name in (f"recordings/{number}{i}.wav", *SILENCE_FILE_NAMES)
+    ]
+    audio_in: GeneratedAudioIn = (
+        LoopingAudioIn(*file_names, n_loop=args.n_loop, realtime=args.realtime)
+        if args.synthetic_ms is None
+        else SyntheticAudioIn(args.synthetic_ms, realtime=args.realtime)
+    )
+
+    n_utterance = 0
+    n_speech_frame = 0
+    endpoint_seconds = 0.0
+    recognition_seconds = 0.0
+    endpointer_stats = EndpointerStats()
+    start_time = perf_counter()
+    with audio_in:
+        while not (audio_in.finished.is_set() and audio_in.audio_queue.empty()):
+            write_queue: Queue[bytes | None] = Queue()
+            endpointer = Endpointer(audio_in, write_queue, stats=endpointer_stats)
+            speeches = []
+            while (data := write_queue.get()) is not None:
+                speeches.append(np.frombuffer(data, dtype=np.int16))
+            endpointer.thread.join()
+            endpoint_seconds = perf_counter() - start_time - recognition_seconds
+            if len(speeches) == 0:
+                continue
+
+            n_utterance += 1
+            speech = np.concatenate(speeches)
+            n_speech_frame += len(speech)
+            if not args.endpoint_only:
+                recognition_start_time = perf_counter()
+                input_mfcc = derive_cepstrum_velocities(mfcc_homebrew(speech)[0])
+                time_sync_dtw_search(template_mfcc_s, input_mfcc)
+                recognition_seconds += perf_counter() - recognition_start_time
+
+    audio_seconds = audio_in.n_frame_sent / SAMPLING_RATE
+    speech_seconds = n_speech_frame / SAMPLING_RATE
+    print(
+        f"""Audio: {audio_seconds:.1f}s, speech: {speech_seconds:.1f}s in {n_utterance} utterances.
+Endpointing: {endpoint_seconds:.2f}s, {speed(audio_seconds, endpoint_seconds)}."""
+    )
+    print(f"Audio source: {audio_in.stats.summary()}")
+    print(f"Endpointer: {endpointer_stats.summary()}")
+    if args.endpoint_only:
+        return
+    if n_utterance == 0:
+        print("Recognition: skipped, no utterances were endpointed.")
+    else:
+        print(
+            f"Recognition: {recognition_seconds:.2f}s, {speed(speech_seconds, recognition_seconds)}."
+        )
+
+
+def speed(audio_seconds: float, seconds: float) -> str:
+    """How many times faster than real time `audio_seconds` of audio was
+    processed in `seconds`."""
+    if seconds <= 0:
+        return "too fast to measure"
+    return f"{audio_seconds / seconds:.1f}× real time"
+
+
+main() if __name__ == "__main__" else None
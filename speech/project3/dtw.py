@@ -1,5 +1,5 @@
 from logging import debug
-from typing import Iterable
+from typing import Generic, Iterable
 
 import numpy as np
 from numpy.typing import NDArray
@@ -16,7 +16,7 @@ def single_dtw_search(
     """Conduct a single dynamic time warping search on given `template` and
     `input_frames`. Return the total cost if the search is done."""
     node_cost_fn = DTWEnuclideanNodeCostFn(template=template)
-    costs = DTWCosts(len(template), node_cost_fn)
+    costs = DTWCosts(len(template), node_cost_fn, keep_columns=False)
     finish_costs = []
     for input_frame in input_frames:
         if total_cost := costs.add_input(input_frame):
@@ -24,53 +24,209 @@ def single_dtw_search(
     return finish_costs
 
 
+class PackedTemplates(Generic[T]):
+    """Templates packed into one array padded to the longest template, for
+    searching all of them at once. Pack the templates once to reuse them
+    across searches."""
+
+    frames: NDArray[np.float32]
+    """Template frames, of shape (number of templates, longest template
+    length, number of features). Padding frames are 0."""
+    lengths: NDArray[np.int64]
+    predictions: list[T]
+    padding_costs: NDArray[np.float32]
+    """0 for template frames, infinity for padding frames."""
+    square_norms: NDArray[np.float64]
+    """Squared Euclidean norm of each template frame, cached for
+    `node_cost_matrix`."""
+
+    def __init__(self, templates: Iterable[tuple[NDArray[np.float32], T]]):
+        templates = list(templates)
+        self.predictions = [prediction for _, prediction in templates]
+        self.lengths = np.array([len(template) for template, _ in templates])
+        max_len = int(self.lengths.max(initial=0))
+        n_feature = templates[0][0].shape[1] if templates else 0
+        self.frames = np.zeros((len(templates), max_len, n_feature), dtype=np.float32)
+        for frames, (template, _) in zip(self.frames, templates):
+            frames[: len(template)] = template
+        self.padding_costs = np.where(
+            np.arange(max_len) < self.lengths[:, np.newaxis], 0, INF_FLOAT32
+        ).astype(np.float32)
+        self.square_norms = np.einsum(
+            "ijk,ijk->ij", self.frames, self.frames, dtype=np.float64
+        )
+
+    ARRAY_NAMES = ("frames", "lengths", "padding_costs", "square_norms")
+    """Names of the arrays that make up packed templates."""
+
+    @classmethod
+    def from_arrays(
+        cls, predictions: list[T], arrays: dict[str, NDArray]
+    ) -> "PackedTemplates[T]":
+        """Packed templates made of existing `arrays` by `ARRAY_NAMES`,
+        without copying them."""
+        packed_templates = cls.__new__(cls)
+        packed_templates.predictions = predictions
+        for name in cls.ARRAY_NAMES:
+            setattr(packed_templates, name, arrays[name])
+        return packed_templates
+
+    def first(self, n_template: int) -> "PackedTemplates[T]":
+        """The first `n_template` templates, sharing memory with `self`."""
+        max_len = int(self.lengths[:n_template].max(initial=0))
+        return PackedTemplates.from_arrays(
+            self.predictions[:n_template],
+            {
+                "frames": self.frames[:n_template, :max_len],
+                "lengths": self.lengths[:n_template],
+                "padding_costs": self.padding_costs[:n_template, :max_len],
+                "square_norms": self.square_norms[:n_template, :max_len],
+            },
+        )
+
+    def __len__(self):
+        return len(self.predictions)
+
+    def node_costs(
+        self, input_frame: NDArray[np.float32], mask: NDArray[np.bool_]
+    ) -> NDArray[np.float32]:
+        """Node costs of `input_frame` against every frame of the templates
+        selected by `mask`, infinite for padding frames."""
+        frames = self.frames if mask.all() else self.frames[mask]
+        node_costs = np.linalg.norm(frames - input_frame, axis=2)
+        node_costs /= self.lengths[mask, np.newaxis].astype(np.float32)
+        node_costs += self.padding_costs[mask]
+        return node_costs
+
+    def node_cost_matrix(
+        self, input_frames: NDArray[np.float32]
+    ) -> NDArray[np.float32]:
+        """Node costs of every input frame against every template frame, of
+        shape (number of input frames, number of templates, longest template
+        length), for offline searches where all input frames are known.
+        The Euclidean distances come from one matrix product as
+        ‖a‖² + ‖b‖² - 2a·b, in double precision to avoid cancellation."""
+        input_frames = np.asarray(input_frames, dtype=np.float64)
+        n_template, max_len, n_feature = self.frames.shape
+        square_distances = input_frames @ self.frames.reshape(-1, n_feature).T
+        square_distances *= -2
+        square_distances += self.square_norms.reshape(-1)
+        square_distances += np.einsum("ij,ij->i", input_frames, input_frames)[
+            :, np.newaxis
+        ]
+        np.maximum(square_distances, 0, out=square_distances)
+        node_costs = np.sqrt(square_distances).astype(np.float32)
+        node_costs = node_costs.reshape(len(input_frames), n_template, max_len)
+        node_costs /= self.lengths[:, np.newaxis].astype(np.float32)
+        node_costs += self.padding_costs
+        return node_costs
+
+
+def offline_dtw_total_costs(
+    templates: PackedTemplates,
+    input_frames: NDArray[np.float32],
+    node_costs: NDArray[np.float32] | None = None,
+) -> NDArray[np.float32]:
+    """Conduct dynamic time warping searches of `input_frames` on every
+    template without pruning, over `node_costs` from
+    `templates.node_cost_matrix(input_frames)` if not given. Return the total
+    cost of each template after each input frame, of shape (number of input
+    frames, number of templates), infinite where the end of the template is
+    not reached. Column `k` has the costs `single_dtw_search` finds for
+    template `k`."""
+    if node_costs is None:
+        node_costs = templates.node_cost_matrix(input_frames)
+    n_template = len(templates)
+    template_indexes = np.arange(n_template)
+    end_indexes = templates.lengths - 1
+    total_costs = np.full((len(node_costs), n_template), INF_FLOAT32)
+    if len(node_costs) == 0:
+        return total_costs
+    last_columns = np.full(templates.padding_costs.shape, INF_FLOAT32)
+    last_columns[:, 0] = node_costs[0][:, 0]
+    new_columns = np.empty_like(last_columns)
+    for frame_index in range(1, len(node_costs)):
+        new_columns[:, 0] = last_columns[:, 0]
+        np.minimum(last_columns[:, 1:], last_columns[:, :-1], out=new_columns[:, 1:])
+        np.minimum(new_columns[:, 2:], last_columns[:, :-2], out=new_columns[:, 2:])
+        new_columns += node_costs[frame_index]
+        total_costs[frame_index] = new_columns[template_indexes, end_indexes]
+        last_columns, new_columns = new_columns, last_columns
+    return total_costs
+
+
 def time_sync_dtw_search(
-    templates: Iterable[tuple[NDArray[np.float32], T]],
+    templates: Iterable[tuple[NDArray[np.float32], T]] | PackedTemplates[T],
     input_frames: NDArray[np.float32],
     pruning_threshold=BEST_PRUNING_THRESHOLD,
+    node_costs: NDArray[np.float32] | None = None,
 ) -> tuple[np.float32, T | None]:
     """Conduct time-synchronous dynamic time warping search on given `templates`
     and `input_frames`. Return the minimum cost found, and the corresponding
-    prediction if the search is done."""
-    costs_and_predictions = [
-        (
-            DTWCosts(len(template), DTWEnuclideanNodeCostFn(template=template)),
-            prediction,
-        )
-        for template, prediction in templates
-    ]
-    pruned_list = [False for _ in templates]
+    prediction if the search is done.
+    The last cost columns of all templates are updated together for each input
+    frame, and pruned templates are masked out. Offline, pass `node_costs` from
+    `templates.node_cost_matrix(input_frames)` to reuse them across searches,
+    e.g., with different `pruning_threshold`s."""
+    if not isinstance(templates, PackedTemplates):
+        templates = PackedTemplates(templates)
+    n_template = len(templates)
+    last_columns = np.full(
+        templates.padding_costs.shape, fill_value=INF_FLOAT32, dtype=np.float32
+    )
+    r"""P_{\_, j-1} of each template."""
+    unpruned = np.ones(n_template, dtype=np.bool_)
+    template_indexes = np.arange(n_template)
+    end_indexes = templates.lengths - 1
 
     global_min_cost = INF_FLOAT32
     global_best_prediction = None
 
-    for input_frame in input_frames:
-        round_min_cost = INF_FLOAT32
-        for index, ((costs, prediction), pruned) in enumerate(
-            zip(costs_and_predictions, pruned_list)
-        ):
-            if pruned:
-                continue
-
-            if (
-                total_cost := costs.add_input(input_frame)
-            ) and total_cost < global_min_cost:
-                global_min_cost = total_cost
-                global_best_prediction = prediction
-                debug(f"Got new best total cost {total_cost:.2f} for `{prediction}`.")
-            round_min_cost = min(round_min_cost, costs.min_cost)
-
-        past_round_threshold = round_min_cost + pruning_threshold
-        for index, ((costs, prediction), pruned) in enumerate(
-            zip(costs_and_predictions, pruned_list)
-        ):
-            if pruned:
-                continue
-            if costs.min_cost > past_round_threshold:
-                pruned_list[index] = True
-                debug(f"Pruned template {index} for `{prediction}`.")
-            else:
-                costs.prune(past_round_threshold)
+    for frame_index, input_frame in enumerate(input_frames):
+        if not unpruned.any():
+            break
+        frame_node_costs = (
+            templates.node_costs(input_frame, unpruned)
+            if node_costs is None
+            else node_costs[frame_index][unpruned]
+        )
+        if frame_index == 0:
+            last_columns[:, 0] = frame_node_costs[:, 0]
+            continue
+        unpruned_indexes = template_indexes[unpruned]
+
+        last_column = last_columns[unpruned]
+        min_prev_costs = last_column.copy()
+        np.minimum(
+            min_prev_costs[:, 1:], last_column[:, :-1], out=min_prev_costs[:, 1:]
+        )
+        np.minimum(
+            min_prev_costs[:, 2:], last_column[:, :-2], out=min_prev_costs[:, 2:]
+        )
+        r"""\min(P_{i-2, j-1}, P_{i-1, j-1}, P_{i, j-1})"""
+        new_columns = min_prev_costs + frame_node_costs
+
+        total_costs = new_columns[
+            np.arange(len(unpruned_indexes)), end_indexes[unpruned]
+        ]
+        best_index = np.argmin(total_costs)
+        if (total_cost := total_costs[best_index]) < global_min_cost:
+            global_min_cost = total_cost
+            global_best_prediction = templates.predictions[unpruned_indexes[best_index]]
+            debug(
+                "Got new best total cost %.2f for `%s`.",
+                total_cost,
+                global_best_prediction,
+            )
+
+        min_costs = new_columns.min(axis=1)
+        past_round_threshold = min_costs.min() + pruning_threshold
+        newly_pruned = min_costs > past_round_threshold
+        for index in unpruned_indexes[newly_pruned]:
+            debug("Pruned template %d for `%s`.", index, templates.predictions[index])
+        new_columns[new_columns > past_round_threshold] = INF_FLOAT32
+        last_columns[unpruned] = new_columns
+        unpruned[unpruned_indexes[newly_pruned]] = False
     return global_min_cost, global_best_prediction
 
 
@@ -85,26 +241,74 @@ class DTWEnuclideanNodeCostFn(NodeCostFn):
         distance = euclidean_distance(input_frame, self.template[template_frame_index])
         return distance / self.template_len
 
+    def column(
+        self, input_frame: NDArray[np.float32], template_len: int
+    ) -> NDArray[np.float32]:
+        assert template_len == self.template_len
+        distances = np.linalg.norm(self.template - input_frame, axis=1)
+        return distances / np.float32(self.template_len)
+
 
 class DTWCosts:
-    """Growable costs matrix for dynamic time warping."""
+    """Growable costs matrix for dynamic time warping.
+    With `keep_columns=False`, only the last two cost columns are kept, in two
+    buffers reused in turn, for searches that only need the costs. With
+    `keep_backpointers=True`, the step taken into each cell is kept as one
+    `int8` per cell, so `alignment` can trace the best path back."""
 
     template_len: int
     node_cost: NodeCostFn
     cost_columns: list[NDArray[np.float32]]
+    """All cost columns so far, or only the last two if not `keep_columns`."""
     min_cost: np.float32
+    keep_columns: bool
+    n_input: int
+    _backpointers: NDArray[np.int8] | None
+    """How many template frames back the best predecessor of each cell is, each
+    row an input frame; `None` if not kept."""
 
-    def __init__(self, template_len: int, node_cost: NodeCostFn):
+    def __init__(
+        self,
+        template_len: int,
+        node_cost: NodeCostFn,
+        keep_columns=True,
+        keep_backpointers=False,
+        capacity=256,
+    ):
         self.template_len = template_len
         self.node_cost = node_cost
         self.cost_columns = []
         self.min_cost = INF_FLOAT32
+        self.keep_columns = keep_columns
+        self.n_input = 0
+        self._backpointers = (
+            np.empty((capacity, template_len), dtype=np.int8)
+            if keep_backpointers
+            else None
+        )
 
     def empty_column(self) -> NDArray[np.float32]:
         return np.full(
             shape=self.template_len, fill_value=INF_FLOAT32, dtype=np.float32
         )
 
+    @property
+    def backpointers(self) -> NDArray[np.int8] | None:
+        """Backpointers of all cells so far, each row an input frame."""
+        if self._backpointers is None:
+            return None
+        return self._backpointers[: self.n_input]
+
+    def _next_backpointers(self) -> NDArray[np.int8]:
+        assert self._backpointers is not None
+        if self.n_input == len(self._backpointers):
+            backpointers = np.empty(
+                (2 * len(self._backpointers), self.template_len), dtype=np.int8
+            )
+            backpointers[: self.n_input] = self._backpointers
+            self._backpointers = backpointers
+        return self._backpointers[self.n_input]
+
     def add_input(self, input_frame: NDArray[np.float32]) -> np.float32 | None:
         """Add an input frame and return the total cost if the end of the
         template is reached."""
@@ -114,31 +318,54 @@ class DTWCosts:
             first_cost = self.node_cost(input_frame, 0)
             first_column[0] = first_cost
             self.cost_columns.append(first_column)
+            if self._backpointers is not None:
+                self._next_backpointers()[:] = 0
+            self.n_input += 1
             return None
 
         last_column = self.cost_columns[-1]
         r"""P_{\_, j-1}"""
 
-        new_column = self.empty_column()
-        min_cost = INF_FLOAT32
-        for template_index in range(self.template_len):
-            safe_template_index_lower = max(template_index - 2, 0)
-            min_prev_cost = np.min(
-                last_column[safe_template_index_lower : template_index + 1]
-            )
-            r"""\min(P_{i-2, j-1}, P_{i-1, j-1}, P_{i, j-1})"""
-
-            if min_prev_cost < INF_FLOAT32:
-                current_node_cost = self.node_cost(input_frame, template_index)
-                """C_{i,j}"""
-                current_cost = min_prev_cost + current_node_cost
-                new_column[template_index] = current_cost
-                min_cost = min(min_cost, current_cost)
+        if not self.keep_columns and len(self.cost_columns) == 2:
+            new_column = self.cost_columns.pop(0)
+        else:
+            new_column = np.empty_like(last_column)
+        if self._backpointers is None:
+            new_column[0] = last_column[0]
+            np.minimum(last_column[1:], last_column[:-1], out=new_column[1:])
+            np.minimum(new_column[2:], last_column[:-2], out=new_column[2:])
+        else:
+            prev_costs = np.full((3, self.template_len), INF_FLOAT32)
+            prev_costs[0] = last_column
+            prev_costs[1, 1:] = last_column[:-1]
+            prev_costs[2, 2:] = last_column[:-2]
+            backpointers = self._next_backpointers()
+            np.argmin(prev_costs, axis=0, out=backpointers)
+            np.min(prev_costs, axis=0, out=new_column)
+        r"""\min(P_{i-2, j-1}, P_{i-1, j-1}, P_{i, j-1})"""
+
+        new_column += self.node_cost.column(input_frame, self.template_len)
+        r"""P_{i, j} = \min(\ldots) + C_{i,j}; infinite where all three are."""
         self.cost_columns.append(new_column)
-        self.min_cost = min_cost
+        self.min_cost = new_column.min()
+        self.n_input += 1
 
         return total_cost if (total_cost := new_column[-1]) < INF_FLOAT32 else None
 
+    def alignment(self) -> NDArray[np.int64]:
+        """The template frame index aligned with each input frame so far along
+        the best path to the end of the template, traced back through the
+        backpointers. Requires `keep_backpointers`."""
+        backpointers = self.backpointers
+        assert backpointers is not None, "Backpointers are not kept."
+        assert self.cost_columns[-1][-1] < INF_FLOAT32, "The template is not done."
+        path = np.empty(self.n_input, dtype=np.int64)
+        template_index = self.template_len - 1
+        for input_index in range(self.n_input - 1, -1, -1):
+            path[input_index] = template_index
+            template_index -= backpointers[input_index, template_index]
+        return path
+
     def prune(self, threshold: np.float32):
         """Prune values in the last costs column that are higher than
         `threshold`."""
@@ -2,21 +2,24 @@
 recordings with odd indexes using `10`s in `recordings/` as templates.
 Run as `python3 -m speech.project3.dtw_accuracy_vs_threshold`."""
 
+import argparse
+
 import matplotlib.pyplot as plt
 from matplotlib.axes import Axes
 
 from speech.project2.main import NUMBERS
 from speech.project3 import TEST_INDEXES, boosted_mfcc_from_file
-from speech.project3.dtw_single_template_time_sync import recognize_number
+from speech.project3.dtw import PackedTemplates
+from speech.project3.dtw_parallel import (
+    RecognitionJob,
+    accuracies_by_label,
+    recognize_in_parallel,
+)
 
 PRUNING_THRESHOLDS = range(40)
 
 
-def all_numbers_recognition_accuracy(template_mfcc_s, pruning_threshold):
-    accuracies = [
-        recognize_number(number, template_mfcc_s, pruning_threshold) / len(TEST_INDEXES)
-        for number in NUMBERS
-    ]
+def print_accuracies(pruning_threshold, accuracies: list[float]) -> float:
     average_accuracy = sum(accuracies) / len(accuracies)
     print(
         f"""\nPruning threshold: {pruning_threshold}
@@ -28,14 +31,36 @@ Accuracy|{"|".join(str(a) for a in accuracies)}|{average_accuracy:.2f}"""
 
 
 def main():
-    template_mfcc_s = [
+    parser = argparse.ArgumentParser(description="DTW accuracy vs pruning threshold")
+    parser.add_argument("-j", "--n-process", type=int, help="Default: CPU count")
+    args = parser.parse_args()
+
+    template_mfcc_s = PackedTemplates(
         (boosted_mfcc_from_file(f"recordings/{number}10.wav"), number)
         for number in NUMBERS
+    )
+    numbers = [number for number in NUMBERS for _ in TEST_INDEXES]
+    jobs = [
+        RecognitionJob(
+            f"recordings/{number}{i}.wav",
+            len(template_mfcc_s),
+            tuple(PRUNING_THRESHOLDS),
+        )
+        for number in NUMBERS
+        for i in TEST_INDEXES
     ]
+    predictions = recognize_in_parallel(template_mfcc_s, jobs, args.n_process)
 
     average_accuracies = [
-        all_numbers_recognition_accuracy(template_mfcc_s, pruning_threshold)
-        for pruning_threshold in PRUNING_THRESHOLDS
+        print_accuracies(
+            pruning_threshold,
+            accuracies_by_label(
+                numbers,
+                [job_predictions[index] for job_predictions in predictions],
+                list(NUMBERS),
+            ),
+        )
+        for index, pruning_threshold in enumerate(PRUNING_THRESHOLDS)
     ]
 
     ax: Axes
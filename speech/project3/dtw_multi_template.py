@@ -8,7 +8,7 @@ from matplotlib.axes import Axes
 
 from speech.project2.main import NUMBERS
 from speech.project3 import TEMPLATE_INDEXES, TEST_INDEXES, boosted_mfcc_from_file
-from speech.project3.dtw import BEST_PRUNING_THRESHOLD
+from speech.project3.dtw import BEST_PRUNING_THRESHOLD, PackedTemplates
 from speech.project3.dtw_single_template_time_sync import recognize_number
 
 
@@ -26,9 +26,10 @@ def main():
                 f"recordings/{number}{template_index}.wav"
             )
             template_mfcc_s.append((template_mfcc, number))
+        packed_templates = PackedTemplates(template_mfcc_s)
 
         accuracies = [
-            recognize_number(number, template_mfcc_s, BEST_PRUNING_THRESHOLD)
+            recognize_number(number, packed_templates, BEST_PRUNING_THRESHOLD)
             / len(TEST_INDEXES)
             for number in NUMBERS
         ]
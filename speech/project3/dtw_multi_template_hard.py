@@ -11,10 +11,15 @@ from matplotlib.axes import Axes
 from speech.project2.main import NUMBERS
 from speech.project3 import (
     HARD_TEMPLATE_INDEXES,
-    HARD_TEST_INDEXES,
+    TEST_INDEXES,
     boosted_mfcc_from_file,
 )
-from speech.project3.dtw_single_template_time_sync import recognize_number
+from speech.project3.dtw import PackedTemplates
+from speech.project3.dtw_parallel import (
+    RecognitionJob,
+    accuracies_by_label,
+    recognize_in_parallel,
+)
 
 BEST_PRUNING_THRESHOLD = 13.0
 
@@ -33,29 +38,42 @@ def main() -> None:
         "--output-path",
         help="Path for output figure.",
     )
+    parser.add_argument("-j", "--n-process", type=int, help="Default: CPU count")
     args = parser.parse_args()
     pruning_threshold = float(args.pruning_threshold or BEST_PRUNING_THRESHOLD)
     output_path = args.output_path or "dtw_n_template_vs_accuracy_hard.png"
 
-    template_mfcc_s = []
-    ns_templates = []
-    average_accuracies = []
-
-    n_template = 0
-    for template_index in HARD_TEMPLATE_INDEXES:
-        n_template += 1
-        ns_templates.append(n_template)
-        for number in NUMBERS:
-            template_mfcc = boosted_mfcc_from_file(
-                f"recordings/{number}{template_index}.wav"
-            )
-            template_mfcc_s.append((template_mfcc, number))
+    # Each round adds one template per number, so the templates of each round
+    # are the first ones of the next.
+    template_mfcc_s = PackedTemplates(
+        (boosted_mfcc_from_file(f"recordings/{number}{template_index}.wav"), number)
+        for template_index in HARD_TEMPLATE_INDEXES
+        for number in NUMBERS
+    )
+    ns_templates = list(range(1, len(HARD_TEMPLATE_INDEXES) + 1))
+    numbers = [number for number in NUMBERS for _ in TEST_INDEXES]
+    jobs = [
+        RecognitionJob(
+            f"recordings/{number}{i}.wav",
+            n_template * len(NUMBERS),
+            (pruning_threshold,),
+        )
+        for n_template in ns_templates
+        for number in NUMBERS
+        for i in TEST_INDEXES
+    ]
+    predictions = recognize_in_parallel(template_mfcc_s, jobs, args.n_process)
 
-        accuracies = [
-            recognize_number(number, template_mfcc_s, pruning_threshold)
-            / len(HARD_TEST_INDEXES)
-            for number in NUMBERS
+    average_accuracies = []
+    for round_index, n_template in enumerate(ns_templates):
+        round_predictions = predictions[
+            round_index * len(numbers) : (round_index + 1) * len(numbers)
         ]
+        accuracies = accuracies_by_label(
+            numbers,
+            [job_predictions[0] for job_predictions in round_predictions],
+            list(NUMBERS),
+        )
         average_accuracy = sum(accuracies) / len(accuracies)
         average_accuracies.append(average_accuracy)
         print(
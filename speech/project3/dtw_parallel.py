@@ -0,0 +1,160 @@
+"""Run time-synchronous DTW recognition of many test files under many settings
+across processes. The packed templates are placed in shared memory once, and
+each worker maps them instead of receiving a pickled copy."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Generic
+
+import numpy as np
+
+from speech import T
+from speech.project3 import boosted_mfcc_from_file
+from speech.project3.dtw import PackedTemplates, time_sync_dtw_search
+
+
+@dataclass(frozen=True)
+class SharedArrayHandle:
+    """Where to find an array in shared memory."""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    def attach(self) -> tuple[SharedMemory, np.ndarray]:
+        """Map the shared array. The array is valid while the returned shared
+        memory is open; the array holds on to the buffer, so closing the
+        shared memory earlier raises `BufferError` instead of unmapping it."""
+        shared_memory = SharedMemory(self.name)
+        array = np.frombuffer(
+            shared_memory.buf, dtype=self.dtype, count=int(np.prod(self.shape))
+        ).reshape(self.shape)
+        array.flags.writeable = False
+        return shared_memory, array
+
+
+class SharedPackedTemplates(Generic[T]):
+    """`PackedTemplates` copied into shared memory by the creating process,
+    which owns the memory until `close`. Pickling it only sends the handles,
+    and other processes `attach` to it."""
+
+    def __init__(self, templates: PackedTemplates[T]):
+        self.predictions = templates.predictions
+        self._shared_memories: list[SharedMemory] = []
+        self.handles: dict[str, SharedArrayHandle] = {}
+        for name in PackedTemplates.ARRAY_NAMES:
+            array: np.ndarray = getattr(templates, name)
+            shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._shared_memories.append(shared_memory)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)[
+                ...
+            ] = array
+            self.handles[name] = SharedArrayHandle(
+                shared_memory.name, array.shape, array.dtype.str
+            )
+
+    def __getstate__(self):
+        return {"predictions": self.predictions, "handles": self.handles}
+
+    def __setstate__(self, state):
+        self.predictions = state["predictions"]
+        self.handles = state["handles"]
+        self._shared_memories = []
+
+    def attach(self) -> PackedTemplates[T]:
+        """The packed templates, mapped from shared memory. They are valid
+        while `self` is alive."""
+        arrays = {}
+        for name, handle in self.handles.items():
+            shared_memory, arrays[name] = handle.attach()
+            self._shared_memories.append(shared_memory)
+        return PackedTemplates.from_arrays(self.predictions, arrays)
+
+    def close(self):
+        """Release the shared memory, from the process that created it."""
+        for shared_memory in self._shared_memories:
+            shared_memory.close()
+            shared_memory.unlink()
+        self._shared_memories.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+@dataclass(frozen=True)
+class RecognitionJob:
+    """Recognize `file_name` using the first `n_template` templates, once
+    with each of `pruning_thresholds`."""
+
+    file_name: str
+    n_template: int
+    pruning_thresholds: tuple[float, ...]
+
+
+_worker_templates: PackedTemplates | None = None
+"""Templates of the current worker process."""
+_worker_shared_templates: SharedPackedTemplates | None = None
+"""Keeps the worker's mapping of `_worker_templates` open."""
+
+
+def _init_worker(shared_templates: SharedPackedTemplates):
+    global _worker_templates, _worker_shared_templates
+    _worker_shared_templates = shared_templates
+    _worker_templates = shared_templates.attach()
+
+
+def recognize(templates: PackedTemplates[T], job: RecognitionJob) -> list[T | None]:
+    """Predictions for `job`, one for each pruning threshold. The node costs
+    are computed once and reused across the thresholds."""
+    templates = templates.first(job.n_template)
+    input_frames = boosted_mfcc_from_file(job.file_name)
+    node_costs = templates.node_cost_matrix(input_frames)
+    return [
+        time_sync_dtw_search(templates, input_frames, pruning_threshold, node_costs)[1]
+        for pruning_threshold in job.pruning_thresholds
+    ]
+
+
+def _recognize_in_worker(job: RecognitionJob):
+    assert _worker_templates is not None
+    return recognize(_worker_templates, job)
+
+
+def recognize_in_parallel(
+    templates: PackedTemplates[T],
+    jobs: list[RecognitionJob],
+    n_process: int | None = None,
+) -> list[list[T | None]]:
+    """Predictions for each of `jobs`, computed across `n_process` processes,
+    or all CPUs by default."""
+    n_process = n_process or os.cpu_count() or 1
+    if n_process == 1:
+        return [recognize(templates, job) for job in jobs]
+    with SharedPackedTemplates(templates) as shared_templates, ProcessPoolExecutor(
+        n_process, initializer=_init_worker, initargs=(shared_templates,)
+    ) as executor:
+        return list(
+            executor.map(
+                _recognize_in_worker,
+                jobs,
+                chunksize=max(1, len(jobs) // (4 * n_process)),
+            )
+        )
+
+
+def accuracies_by_label(
+    labels: list[T], predictions: list[T | None], all_labels: list[T]
+) -> list[float]:
+    """Fraction of correct `predictions` among those with each of
+    `all_labels` as the true label in `labels`."""
+    n_correct = {label: 0 for label in all_labels}
+    n_total = {label: 0 for label in all_labels}
+    for label, prediction in zip(labels, predictions):
+        n_total[label] += 1
+        n_correct[label] += prediction == label
+    return [n_correct[label] / max(n_total[label], 1) for label in all_labels]
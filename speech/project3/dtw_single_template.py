@@ -6,17 +6,22 @@ import argparse
 
 from speech.project2.main import NUMBERS
 from speech.project3 import INF_FLOAT32, TEST_INDEXES, boosted_mfcc_from_file
-from speech.project3.dtw import single_dtw_search
+from speech.project3.dtw import PackedTemplates, offline_dtw_total_costs
 
 
-def recognize_number(number: str, template_mfcc_s, cost_interpretation="min"):
+def recognize_number(
+    number: str, template_mfcc_s: PackedTemplates[str], cost_interpretation="min"
+):
     n_correct = 0
     for i in TEST_INDEXES:
         test_mfcc = boosted_mfcc_from_file(f"recordings/{number}{i}.wav")
         min_cost = INF_FLOAT32
         prediction = None
-        for template_mfcc, associated_number in template_mfcc_s:
-            current_costs = single_dtw_search(template_mfcc, test_mfcc)
+        total_costs = offline_dtw_total_costs(template_mfcc_s, test_mfcc)
+        for template_costs, associated_number in zip(
+            total_costs.T, template_mfcc_s.predictions
+        ):
+            current_costs = template_costs[template_costs < INF_FLOAT32]
             if len(current_costs) == 0:
                 continue
             match cost_interpretation:
@@ -54,10 +59,10 @@ def main():
     args = parser.parse_args()
     cost_interpretation = args.cost_interpretation or "min"
 
-    template_mfcc_s = [
+    template_mfcc_s = PackedTemplates(
         (boosted_mfcc_from_file(f"recordings/{number}10.wav"), number)
         for number in NUMBERS
-    ]
+    )
 
     accuracies = [
         recognize_number(number, template_mfcc_s, cost_interpretation) / 5
@@ -6,10 +6,13 @@ import argparse
 
 from speech.project2.main import NUMBERS
 from speech.project3 import TEST_INDEXES, boosted_mfcc_from_file
-from speech.project3.dtw import time_sync_dtw_search
+from speech.project3.dtw import PackedTemplates, time_sync_dtw_search
 
 
 def recognize_number(number: str, template_mfcc_s, pruning_threshold=10.0):
+    """Count the correct predictions for the test recordings of `number`."""
+    if not isinstance(template_mfcc_s, PackedTemplates):
+        template_mfcc_s = PackedTemplates(template_mfcc_s)
     n_correct = 0
     for i in TEST_INDEXES:
         test_mfcc = boosted_mfcc_from_file(f"recordings/{number}{i}.wav")
@@ -43,10 +46,10 @@ def main():
     args = parser.parse_args()
     pruning_threshold = float(args.pruning_threshold or "10")
 
-    template_mfcc_s = [
+    template_mfcc_s = PackedTemplates(
         (boosted_mfcc_from_file(f"recordings/{number}10.wav"), number)
         for number in NUMBERS
-    ]
+    )
 
     accuracies = [
         recognize_number(number, template_mfcc_s, pruning_threshold) / len(TEST_INDEXES)
@@ -0,0 +1,212 @@
+"""Run with `python3 -m speech.project3.dtw_test`."""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from speech.project3 import (
+    INF_FLOAT32,
+    boosted_mfcc_from_file,
+    use_temporary_feature_cache,
+)
+from speech.project3.dtw import (
+    DTWCosts,
+    DTWEnuclideanNodeCostFn,
+    PackedTemplates,
+    euclidean_distance,
+    offline_dtw_total_costs,
+    single_dtw_search,
+    time_sync_dtw_search,
+)
+from speech.project3.dtw_parallel import (
+    RecognitionJob,
+    SharedPackedTemplates,
+    recognize_in_parallel,
+)
+
+
+def setUpModule():
+    unittest.addModuleCleanup(use_temporary_feature_cache())
+
+
+def naive_dtw_columns(template, input_frames, threshold=None):
+    """Cost columns of DTW computed one cell at a time."""
+    columns = [np.full(len(template), INF_FLOAT32)]
+    columns[0][0] = euclidean_distance(input_frames[0], template[0]) / len(template)
+    for input_frame in input_frames[1:]:
+        column = np.full(len(template), INF_FLOAT32)
+        for i in range(len(template)):
+            min_prev_cost = np.min(columns[-1][max(i - 2, 0) : i + 1])
+            if min_prev_cost < INF_FLOAT32:
+                distance = euclidean_distance(input_frame, template[i])
+                column[i] = min_prev_cost + distance / len(template)
+        if threshold is not None:
+            column[column > column.min() + threshold] = INF_FLOAT32
+        columns.append(column)
+    return columns
+
+
+def per_template_time_sync_dtw_search(templates, input_frames, pruning_threshold):
+    """`time_sync_dtw_search` with one `DTWCosts` per template."""
+    costs_list = [
+        DTWCosts(len(template), DTWEnuclideanNodeCostFn(template))
+        for template, _ in templates
+    ]
+    pruned = [False] * len(templates)
+    min_cost, best_prediction = INF_FLOAT32, None
+    for input_frame in input_frames:
+        round_min_cost = INF_FLOAT32
+        for costs, (_, prediction), is_pruned in zip(costs_list, templates, pruned):
+            if is_pruned:
+                continue
+            total_cost = costs.add_input(input_frame)
+            if total_cost is not None and total_cost < min_cost:
+                min_cost, best_prediction = total_cost, prediction
+            round_min_cost = min(round_min_cost, costs.min_cost)
+        threshold = round_min_cost + pruning_threshold
+        for index, costs in enumerate(costs_list):
+            if not pruned[index]:
+                pruned[index] = costs.min_cost > threshold
+                costs.prune(threshold)
+    return min_cost, best_prediction
+
+
+class TestDTW(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.template = rng.normal(size=(30, 39)).astype(np.float32)
+        self.input_frames = rng.normal(size=(50, 39)).astype(np.float32)
+
+    def test_add_input(self):
+        costs = DTWCosts(len(self.template), DTWEnuclideanNodeCostFn(self.template))
+        for input_frame in self.input_frames:
+            costs.add_input(input_frame)
+            costs.prune(costs.min_cost + np.float32(0.5))
+        expected = naive_dtw_columns(self.template, self.input_frames, 0.5)
+        np.testing.assert_allclose(costs.cost_columns, expected, rtol=1e-5)
+
+    def test_rolling_columns_and_backpointers(self):
+        node_cost_fn = DTWEnuclideanNodeCostFn(self.template)
+        full_costs = DTWCosts(len(self.template), node_cost_fn)
+        rolling_costs = DTWCosts(
+            len(self.template), node_cost_fn, keep_columns=False, capacity=4
+        )
+        backpointer_costs = DTWCosts(
+            len(self.template), node_cost_fn, keep_backpointers=True, capacity=4
+        )
+        for input_frame in self.input_frames:
+            total_cost = full_costs.add_input(input_frame)
+            self.assertEqual(rolling_costs.add_input(input_frame), total_cost)
+            self.assertEqual(backpointer_costs.add_input(input_frame), total_cost)
+        self.assertEqual(len(rolling_costs.cost_columns), 2)
+        np.testing.assert_array_equal(
+            rolling_costs.cost_columns, full_costs.cost_columns[-2:]
+        )
+        assert backpointer_costs.backpointers is not None
+        self.assertEqual(backpointer_costs.backpointers.dtype, np.int8)
+
+        path = backpointer_costs.alignment()
+        self.assertEqual((path[0], path[-1]), (0, len(self.template) - 1))
+        self.assertTrue(np.isin(np.diff(path), (0, 1, 2)).all())
+        path_cost = sum(
+            node_cost_fn(input_frame, template_index)
+            for input_frame, template_index in zip(self.input_frames, path)
+        )
+        self.assertAlmostEqual(path_cost, total_cost, places=4)
+
+    def test_single_dtw_search(self):
+        expected = [
+            column[-1]
+            for column in naive_dtw_columns(self.template, self.input_frames)
+            if column[-1] < INF_FLOAT32
+        ]
+        np.testing.assert_allclose(
+            single_dtw_search(self.template, self.input_frames), expected, rtol=1e-5
+        )
+
+    def test_time_sync_dtw_search(self):
+        rng = np.random.default_rng(1)
+        templates = [
+            (rng.normal(size=(length, 39)).astype(np.float32), i)
+            for i, length in enumerate((20, 31, 25, 40, 12, 33))
+        ]
+        for pruning_threshold in (0.1, 1.0, 100.0):
+            min_cost, prediction = time_sync_dtw_search(
+                PackedTemplates(templates), self.input_frames, pruning_threshold
+            )
+            expected_min_cost, expected_prediction = per_template_time_sync_dtw_search(
+                templates, self.input_frames, pruning_threshold
+            )
+            self.assertIsNotNone(prediction)
+            self.assertEqual(prediction, expected_prediction)
+            np.testing.assert_allclose(min_cost, expected_min_cost, rtol=1e-5)
+
+    def test_offline_dtw(self):
+        rng = np.random.default_rng(2)
+        templates = [
+            (rng.normal(size=(length, 39)).astype(np.float32), i)
+            for i, length in enumerate((20, 31, 12))
+        ]
+        packed_templates = PackedTemplates(templates)
+        node_costs = packed_templates.node_cost_matrix(self.input_frames)
+        for input_frame, frame_node_costs in zip(self.input_frames, node_costs):
+            expected = packed_templates.node_costs(
+                input_frame, np.ones(len(templates), dtype=np.bool_)
+            )
+            np.testing.assert_allclose(frame_node_costs, expected, rtol=1e-5)
+
+        total_costs = offline_dtw_total_costs(packed_templates, self.input_frames)
+        for template_costs, (template, _) in zip(total_costs.T, templates):
+            np.testing.assert_allclose(
+                template_costs[template_costs < INF_FLOAT32],
+                single_dtw_search(template, self.input_frames),
+                rtol=1e-5,
+            )
+        for pruning_threshold in (0.1, 1.0):
+            min_cost, prediction = time_sync_dtw_search(
+                packed_templates, self.input_frames, pruning_threshold, node_costs
+            )
+            expected_min_cost, expected_prediction = time_sync_dtw_search(
+                packed_templates, self.input_frames, pruning_threshold
+            )
+            self.assertEqual(prediction, expected_prediction)
+            np.testing.assert_allclose(min_cost, expected_min_cost, rtol=1e-5)
+
+
+class TestParallelDTW(unittest.TestCase):
+    def test_shared_templates(self):
+        rng = np.random.default_rng(3)
+        packed_templates = PackedTemplates(
+            (rng.normal(size=(length, 39)).astype(np.float32), i)
+            for i, length in enumerate((20, 31, 12))
+        )
+        with SharedPackedTemplates(packed_templates) as shared_templates:
+            unpickled = pickle.loads(pickle.dumps(shared_templates))
+            attached = unpickled.attach()
+            for name in PackedTemplates.ARRAY_NAMES:
+                np.testing.assert_array_equal(
+                    getattr(attached, name), getattr(packed_templates, name)
+                )
+            self.assertEqual(attached.predictions, packed_templates.predictions)
+            del attached, unpickled
+
+    def test_recognize_in_parallel(self):
+        numbers = ("one", "two", "three")
+        packed_templates = PackedTemplates(
+            (boosted_mfcc_from_file(f"recordings/{number}{i}.wav"), number)
+            for i in (10, 12)
+            for number in numbers
+        )
+        jobs = [
+            RecognitionJob(f"recordings/{number}11.wav", n_template, (5.0, 13.0))
+            for n_template in (3, 6)
+            for number in numbers
+        ]
+        self.assertEqual(
+            recognize_in_parallel(packed_templates, jobs, n_process=2),
+            recognize_in_parallel(packed_templates, jobs, n_process=1),
+        )
+
+
+unittest.main() if __name__ == "__main__" else None
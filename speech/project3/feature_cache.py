@@ -0,0 +1,174 @@
+"""Content-addressed on-disk cache of features.
+Entries are keyed by a hash of the audio file content and a hash of the
+front-end configuration, so editing a recording, changing the parameters, or
+bumping the front-end version never serves stale features, and entries are
+safely shared across experiments. The least recently used entries are evicted to bound the cache
+size."""
+
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from logging import debug
+from threading import Lock
+from typing import Callable
+
+import numpy as np
+
+from speech import FloatArray
+
+DEFAULT_CACHE_DIR = "feature_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+"""Default size bound of a feature cache: 256 MiB."""
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_content_hash(file_name: str) -> str:
+    """SHA-256 hex digest of the content of `file_name`."""
+    hasher = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def config_hash(*parts: object) -> str:
+    """SHA-256 hex digest of the `repr` of a front-end configuration made of
+    `parts`."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(repr(part).encode())
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+@dataclass
+class FeatureCacheStats:
+    n_hit: int = 0
+    n_miss: int = 0
+    n_evicted: int = 0
+    n_byte: int = 0
+    """Current size of the cache."""
+
+    @property
+    def hit_rate(self) -> float:
+        n_lookup = self.n_hit + self.n_miss
+        return self.n_hit / n_lookup if n_lookup else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.n_hit} hits, {self.n_miss} misses ({self.hit_rate:.1%} hit rate), "
+            f"{self.n_evicted} evicted, {self.n_byte / 1024 / 1024:.1f} MiB"
+        )
+
+
+class FeatureCache:
+    """Features in `cache_dir` keyed by audio content and front-end
+    configuration hashes, at most `max_bytes` in total.
+    Each entry is a `.npy` file named by its key. The modification time of an
+    entry is its last use, so the LRU order survives restarts and is shared
+    across processes."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = FeatureCacheStats()
+        self.lock = Lock()
+        self._content_hashes: dict[tuple[str, int, int], str] = {}
+        """Content hashes by file name, modification time and size, to avoid
+        rehashing unmodified files."""
+        self._entries: OrderedDict[str, int] | None = None
+        """Size of each entry by key, least recently used first."""
+
+    @property
+    def entries(self) -> OrderedDict[str, int]:
+        if self._entries is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            found = []
+            for dir_entry in os.scandir(self.cache_dir):
+                if dir_entry.name.endswith(".npy"):
+                    stat = dir_entry.stat()
+                    found.append((stat.st_mtime_ns, dir_entry.name[:-4], stat.st_size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+            self.stats.n_byte = sum(self._entries.values())
+        return self._entries
+
+    def key(self, file_name: str, config: str) -> str:
+        """Cache key of the features of `file_name` under front-end
+        configuration hash `config`."""
+        stat = os.stat(file_name)
+        file_id = (os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size)
+        if (content_hash := self._content_hashes.get(file_id)) is None:
+            content_hash = file_content_hash(file_name)
+            self._content_hashes[file_id] = content_hash
+        return hashlib.sha256(f"{content_hash}:{config}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key: str) -> FloatArray | None:
+        """The cached features of `key`, or `None` on a miss."""
+        path = self._path(key)
+        with self.lock:
+            try:
+                features = np.load(path)
+                os.utime(path)
+            except (FileNotFoundError, ValueError):
+                # Never cached, evicted by another process, or corrupt.
+                if key in self.entries:
+                    self.stats.n_byte -= self.entries.pop(key)
+                self.stats.n_miss += 1
+                return None
+            if key not in self.entries:
+                # Cached by another process.
+                self.entries[key] = os.path.getsize(path)
+                self.stats.n_byte += self.entries[key]
+            self.entries.move_to_end(key)
+            self.stats.n_hit += 1
+            return features
+
+    def put(self, key: str, features: FloatArray):
+        """Cache `features` under `key`, evicting the least recently used
+        entries beyond the size bound."""
+        path = self._path(key)
+        with self.lock:
+            entries = self.entries
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                np.save(file, features)
+            os.replace(tmp_path, path)
+            if key in entries:
+                self.stats.n_byte -= entries.pop(key)
+            entries[key] = os.path.getsize(path)
+            self.stats.n_byte += entries[key]
+            while self.stats.n_byte > self.max_bytes and len(entries) > 1:
+                evicted_key, size = entries.popitem(last=False)
+                debug(f"Evicting {evicted_key} from the feature cache.")
+                try:
+                    os.remove(self._path(evicted_key))
+                except FileNotFoundError:
+                    pass
+                self.stats.n_byte -= size
+                self.stats.n_evicted += 1
+
+    def get_or_compute(
+        self, file_name: str, config: str, compute: Callable[[], FloatArray]
+    ) -> FloatArray:
+        """The cached features of `file_name` under front-end configuration
+        hash `config`, computed by `compute` and cached on a miss."""
+        key = self.key(file_name, config)
+        if (features := self.get(key)) is not None:
+            return features
+        features = compute()
+        self.put(key, features)
+        return features
+
+    def clear(self):
+        with self.lock:
+            for key in self.entries:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self.entries.clear()
+            self.stats.n_byte = 0
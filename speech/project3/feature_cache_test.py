@@ -0,0 +1,54 @@
+"""Run with `python3 -m speech.project3.feature_cache_test`."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from speech.project3 import boosted_mfcc_config_hash, calculate_boosted_mfcc
+from speech.project3.feature_cache import FeatureCache
+
+
+class TestFeatureCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_content_addressed(self):
+        cache = FeatureCache(os.path.join(self.dir, "cache"))
+        file_name = os.path.join(self.dir, "one.wav")
+        shutil.copy("recordings/one10.wav", file_name)
+        config = boosted_mfcc_config_hash(40, 13)
+        compute = lambda: calculate_boosted_mfcc(file_name)
+        expected = cache.get_or_compute(file_name, config, compute)
+        np.testing.assert_array_equal(
+            cache.get_or_compute(file_name, config, compute), expected
+        )
+        self.assertEqual((cache.stats.n_hit, cache.stats.n_miss), (1, 1))
+
+        cache.get_or_compute(file_name, boosted_mfcc_config_hash(30, 13), compute)
+        self.assertEqual(cache.stats.n_miss, 2)
+        shutil.copy("recordings/two10.wav", file_name)
+        features = cache.get_or_compute(file_name, config, compute)
+        self.assertEqual(cache.stats.n_miss, 3)
+        np.testing.assert_array_equal(features, calculate_boosted_mfcc(file_name))
+
+    def test_lru_eviction(self):
+        cache = FeatureCache(os.path.join(self.dir, "cache"), max_bytes=3000)
+        features = np.zeros((10, 39), dtype=np.float32)  # 1560 B, 1688 B as .npy.
+        cache.put("a", features)
+        cache.put("b", features)
+        self.assertEqual(list(cache.entries), ["b"])
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+        self.assertEqual(cache.stats.n_evicted, 1)
+        reopened = FeatureCache(cache.cache_dir, max_bytes=3000)
+        self.assertEqual(list(reopened.entries), ["b"])
+        self.assertEqual(reopened.stats.n_byte, cache.stats.n_byte)
+
+
+unittest.main() if __name__ == "__main__" else None
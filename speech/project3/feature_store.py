@@ -0,0 +1,264 @@
+"""Extract the boosted MFCC features of a whole corpus in parallel into one
+feature store: a directory with all features in one contiguous float32 blob,
+and an index of each file's path, modification time, offset and number of
+frames in the blob, like a Kaldi ark and scp. Files unchanged since the last
+extraction are reused. Each extraction writes a new blob named in the index,
+so replacing the index commits the update atomically, and keeps the previous
+blob for processes still reading it. Stored features are read as
+memory-mapped views.
+Run with `python3 -m speech.project3.feature_store 'recordings/*.wav'`."""
+
+import argparse
+import glob
+import os
+import uuid
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from logging import warning
+from typing import Iterator
+
+import numpy as np
+
+from speech import FloatArray
+from speech.project1.corpus_recorder import read_manifest
+from speech.project2.lib import N_MFCC_COEFFICIENTS
+from speech.project3 import (
+    boosted_mfcc_config_hash,
+    boosted_mfcc_from_file,
+    calculate_boosted_mfcc,
+)
+
+DEFAULT_STORE_DIR = "feature_store"
+BLOB_FILE_PREFIX = "features-"
+BLOB_FILE_SUFFIX = ".f32"
+"""Blobs of all features in a feature store are named
+`{BLOB_FILE_PREFIX}{version}{BLOB_FILE_SUFFIX}`."""
+INDEX_FILE_NAME = "index.npz"
+"""Name of the index, blob name and front-end configuration in a feature
+store. The configuration includes `boosted_mfcc_config_hash`, and features
+stored under another configuration hash are stale."""
+
+
+def index_dtype(max_path_len: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("path", f"U{max_path_len}"),
+            ("mtime_ns", np.int64),
+            ("offset", np.int64),
+            ("n_frame", np.int64),
+        ]
+    )
+
+
+class FeatureStore(Mapping[str, FloatArray]):
+    """Boosted MFCC features in the feature store in `store_dir` by path, each
+    row a frame of `3 × n_mfcc_coefficients` features.
+    The blob is memory-mapped when the index is read, and features are
+    read-only views into it, so only the pages used are loaded, and corpora
+    larger than memory can be used. Mapping upfront keeps the features
+    readable after a rebuild removes the blob."""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        with np.load(os.path.join(store_dir, INDEX_FILE_NAME)) as index_file:
+            self.index = index_file["index"]
+            self.blob_file_name = str(index_file["blob_file_name"])
+            self.n_filter_banks = int(index_file["n_filter_banks"])
+            self.n_mfcc_coefficients = int(index_file["n_mfcc_coefficients"])
+            self.config_hash = str(index_file["config_hash"])
+        self.positions = {str(path): i for i, path in enumerate(self.index["path"])}
+        n_frame = int(self.index["n_frame"].sum())
+        n_feature = 3 * self.n_mfcc_coefficients
+        self.features: FloatArray = (
+            np.memmap(
+                os.path.join(store_dir, self.blob_file_name),
+                dtype=np.float32,
+                mode="r",
+                shape=(n_frame, n_feature),
+            )
+            if n_frame > 0
+            # Empty files cannot be memory-mapped.
+            else np.empty((0, n_feature), dtype=np.float32)
+        )
+        """All features in the blob, each row a frame."""
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.positions)
+
+    def __contains__(self, path: object):
+        return path in self.positions
+
+    def __getitem__(self, path: str) -> FloatArray:
+        entry = self.index[self.positions[path]]
+        return self.features[entry["offset"] : entry["offset"] + entry["n_frame"]]
+
+    def has_config(self, n_filter_banks: int, n_mfcc_coefficients: int) -> bool:
+        """Whether the features were extracted with `n_filter_banks` filter
+        banks, `n_mfcc_coefficients` coefficients and the current front end."""
+        return self.config_hash == boosted_mfcc_config_hash(
+            n_filter_banks, n_mfcc_coefficients
+        )
+
+    def is_fresh(self, path: str) -> bool:
+        """Whether the features of `path` exist and `path` is unmodified.
+        Check `has_config` for the front-end configuration."""
+        return (
+            path in self.positions
+            and self.index[self.positions[path]]["mtime_ns"]
+            == os.stat(path).st_mtime_ns
+        )
+
+
+def build_feature_store(
+    file_names: list[str],
+    store_dir=DEFAULT_STORE_DIR,
+    n_filter_banks=40,
+    n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+    n_process: int | None = None,
+) -> FeatureStore:
+    """Extract the features of `file_names` into the feature store in
+    `store_dir` across `n_process` processes, reusing the features of files
+    unchanged since they were stored with the same configuration. Features of
+    files not in `file_names` are dropped."""
+    os.makedirs(store_dir, exist_ok=True)
+    old_store = None
+    old_blob_file_name = None
+    if os.path.exists(os.path.join(store_dir, INDEX_FILE_NAME)):
+        old_store = FeatureStore(store_dir)
+        old_blob_file_name = old_store.blob_file_name
+        if not old_store.has_config(n_filter_banks, n_mfcc_coefficients):
+            old_store = None
+    mtimes_ns = [os.stat(file_name).st_mtime_ns for file_name in file_names]
+    stale_file_names = [
+        file_name
+        for file_name in file_names
+        if old_store is None or not old_store.is_fresh(file_name)
+    ]
+    print(f"Extracting {len(stale_file_names)} of {len(file_names)} files.")
+    with ProcessPoolExecutor(n_process) as executor:
+        extracted = dict(
+            zip(
+                stale_file_names,
+                executor.map(
+                    calculate_boosted_mfcc,
+                    stale_file_names,
+                    [n_filter_banks] * len(stale_file_names),
+                    [n_mfcc_coefficients] * len(stale_file_names),
+                    chunksize=max(1, len(stale_file_names) // 64),
+                ),
+            )
+        )
+
+    index = np.empty(
+        len(file_names), dtype=index_dtype(max(map(len, file_names), default=1))
+    )
+    offset = 0
+    blob_file_name = f"{BLOB_FILE_PREFIX}{uuid.uuid4().hex}{BLOB_FILE_SUFFIX}"
+    with open(os.path.join(store_dir, blob_file_name), "wb") as blob_file:
+        for i, (file_name, mtime_ns) in enumerate(zip(file_names, mtimes_ns)):
+            features = (
+                extracted[file_name]
+                if file_name in extracted
+                else old_store[file_name]  # type: ignore
+            )
+            features = np.atleast_2d(features).astype(np.float32, copy=False)
+            blob_file.write(features.tobytes())
+            index[i] = (file_name, mtime_ns, offset, len(features))
+            offset += len(features)
+    del old_store
+    index_file_name = os.path.join(store_dir, INDEX_FILE_NAME)
+    with open(f"{index_file_name}.tmp", "wb") as index_file:
+        np.savez(
+            index_file,
+            index=index,
+            blob_file_name=blob_file_name,
+            n_filter_banks=n_filter_banks,
+            n_mfcc_coefficients=n_mfcc_coefficients,
+            config_hash=boosted_mfcc_config_hash(n_filter_banks, n_mfcc_coefficients),
+        )
+    # The new blob is only used once the index naming it replaces the old one.
+    os.replace(f"{index_file_name}.tmp", index_file_name)
+    # Processes that just read the old index may still be mapping its blob.
+    remove_unused_blobs(store_dir, {blob_file_name, old_blob_file_name})
+    open_feature_store.cache_clear()
+    return FeatureStore(store_dir)
+
+
+def remove_unused_blobs(store_dir: str, kept_blob_file_names: set[str | None]):
+    """Remove the blobs in `store_dir` other than `kept_blob_file_names`,
+    left by earlier or interrupted extractions."""
+    for dir_entry in os.scandir(store_dir):
+        if (
+            dir_entry.name.startswith(BLOB_FILE_PREFIX)
+            and dir_entry.name.endswith(BLOB_FILE_SUFFIX)
+            and dir_entry.name not in kept_blob_file_names
+        ):
+            os.remove(dir_entry.path)
+
+
+@lru_cache(maxsize=4)
+def open_feature_store(store_dir=DEFAULT_STORE_DIR) -> FeatureStore | None:
+    """The feature store in `store_dir`, opened once, or `None` if missing."""
+    if not os.path.exists(os.path.join(store_dir, INDEX_FILE_NAME)):
+        return None
+    return FeatureStore(store_dir)
+
+
+def boosted_mfccs_from_files(
+    file_names: list[str],
+    n_filter_banks=40,
+    n_mfcc_coefficients=N_MFCC_COEFFICIENTS,
+    store_dir=DEFAULT_STORE_DIR,
+) -> list[FloatArray]:
+    """Boosted MFCC features of `file_names`, as memory-mapped views into the
+    feature store in `store_dir` for files it has up-to-date features of in
+    the same configuration, otherwise from `boosted_mfcc_from_file`."""
+    store = open_feature_store(store_dir)
+    if store is not None and not store.has_config(n_filter_banks, n_mfcc_coefficients):
+        warning(
+            "Ignoring the feature store in %s, extracted with another "
+            "front-end configuration. Rebuild it with "
+            "`python3 -m speech.project3.feature_store`.",
+            store_dir,
+        )
+        store = None
+    return [
+        (
+            store[file_name]
+            if store is not None and store.is_fresh(file_name)
+            else boosted_mfcc_from_file(file_name, n_filter_banks, n_mfcc_coefficients)
+        )
+        for file_name in file_names
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Corpus feature extraction")
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        help="WAV file globs, or CSV manifests from the corpus recorder",
+    )
+    parser.add_argument("-o", "--output", default=DEFAULT_STORE_DIR)
+    parser.add_argument("-b", "--n-filter-banks", default=40, type=int)
+    parser.add_argument("-j", "--n-process", type=int, help="Default: CPU count")
+    args = parser.parse_args()
+
+    file_names: list[str] = []
+    for source in args.sources:
+        if source.endswith(".csv"):
+            file_names.extend(segment.path for segment in read_manifest(source))
+        else:
+            file_names.extend(sorted(glob.glob(source)))
+    file_names = list(dict.fromkeys(file_names))
+    store = build_feature_store(
+        file_names, args.output, args.n_filter_banks, n_process=args.n_process
+    )
+    print(f"Stored the features of {len(store)} files in {args.output}.")
+
+
+main() if __name__ == "__main__" else None
@@ -0,0 +1,101 @@
+"""Run with `python3 -m speech.project3.feature_store_test`."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+from speech.project3 import calculate_boosted_mfcc, use_temporary_feature_cache
+from speech.project3.feature_store import (
+    INDEX_FILE_NAME,
+    FeatureStore,
+    boosted_mfccs_from_files,
+    build_feature_store,
+    open_feature_store,
+)
+
+
+def setUpModule():
+    unittest.addModuleCleanup(use_temporary_feature_cache())
+
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file_names = []
+        for number in ("one", "two"):
+            file_name = os.path.join(self.dir, f"{number}.wav")
+            shutil.copy(f"recordings/{number}10.wav", file_name)
+            self.file_names.append(file_name)
+        self.store_dir = os.path.join(self.dir, "store")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_rebuild(self):
+        store = build_feature_store(self.file_names, self.store_dir, n_process=1)
+        old_blob_file_name = store.blob_file_name
+        # A blob left by an interrupted extraction is never indexed.
+        orphan = os.path.join(self.store_dir, "features-orphan.f32")
+        with open(orphan, "wb") as orphan_file:
+            orphan_file.write(b"\0" * 64)
+        self.assertEqual(
+            FeatureStore(self.store_dir).blob_file_name, old_blob_file_name
+        )
+
+        old_store = open_feature_store(self.store_dir)
+        assert old_store is not None
+        store = build_feature_store(self.file_names[::-1], self.store_dir, n_process=1)
+        # The previous blob is kept for readers of the previous index.
+        self.assertEqual(
+            sorted(os.listdir(self.store_dir)),
+            sorted((store.blob_file_name, old_blob_file_name, INDEX_FILE_NAME)),
+        )
+        store = build_feature_store(self.file_names, self.store_dir, n_process=1)
+        self.assertNotIn(old_blob_file_name, os.listdir(self.store_dir))
+        for file_name in self.file_names:
+            expected = calculate_boosted_mfcc(file_name)
+            np.testing.assert_array_equal(store[file_name], expected)
+            # Still mapped after its blob is removed.
+            np.testing.assert_array_equal(old_store[file_name], expected)
+
+    def test_empty(self):
+        file_name = os.path.join(self.dir, "short.wav")
+        with wave.open(file_name, "wb") as out_file:
+            out_file.setnchannels(1)
+            out_file.setsampwidth(2)
+            out_file.setframerate(16000)
+            out_file.writeframes(b"\0\0" * 100)
+        build_feature_store([file_name], self.store_dir, n_process=1)
+        self.assertEqual(FeatureStore(self.store_dir)[file_name].shape, (0, 39))
+
+    def test_stale_config(self):
+        build_feature_store(self.file_names, self.store_dir, n_process=1)
+        features = boosted_mfccs_from_files(self.file_names, store_dir=self.store_dir)
+        self.assertTrue(all(isinstance(each, np.memmap) for each in features))
+
+        # As if extracted by an older front end.
+        index_file_name = os.path.join(self.store_dir, INDEX_FILE_NAME)
+        with np.load(index_file_name) as index_file:
+            arrays = dict(index_file)
+        with open(index_file_name, "wb") as index_file:
+            np.savez(index_file, **{**arrays, "config_hash": "stale"})
+        open_feature_store.cache_clear()
+        with self.assertLogs(level="WARNING"):
+            features = boosted_mfccs_from_files(
+                self.file_names, store_dir=self.store_dir
+            )
+        self.assertFalse(any(isinstance(each, np.memmap) for each in features))
+        for file_name, file_features in zip(self.file_names, features):
+            np.testing.assert_array_equal(
+                file_features, calculate_boosted_mfcc(file_name)
+            )
+
+        store = build_feature_store(self.file_names, self.store_dir, n_process=1)
+        self.assertTrue(store.has_config(40, 13))
+
+
+unittest.main() if __name__ == "__main__" else None
@@ -19,6 +19,7 @@ from speech.project3 import (
     TEST_INDEXES,
     boosted_mfcc_from_file,
 )
+from speech.project3.feature_store import boosted_mfccs_from_files
 
 MINUS_INF = -INF_FLOAT32
 
@@ -129,6 +130,8 @@ class HMM_Single:
             It should have the shape (N, l) or (N, l, d), where N is the number of training samples
             and l is the length of each training sample.
             Each training sample can be a scalar or a vector.
+            Samples can be memory-mapped views from a feature store; only the
+            frames of each state are copied out of them while training.
         """
         self._raw_data = data
         self.n_states = n_states
@@ -264,9 +267,7 @@ class HMM_Single:
 def single_hmm_w_template_file_names(
     template_file_names: list[str], n_states: int, n_gaussians: int
 ):
-    template_mfcc_s = [
-        boosted_mfcc_from_file(file_name) for file_name in template_file_names
-    ]
+    template_mfcc_s = boosted_mfccs_from_files(template_file_names)
     return HMM_Single(template_mfcc_s, n_states, n_gaussians)
 
 
@@ -7,10 +7,12 @@ from queue import Queue
 from threading import Thread
 
 import numpy as np
+from numpy.typing import NDArray
 
+from speech.project1.capture_server import serve_forever
 from speech.project1.main import audio_recording_thread
-from speech.project2.lib import derive_cepstrum_velocities, mfcc_homebrew
 from speech.project2.main import NUMBERS
+from speech.project2.streaming import BoostedMFCCConsumer, boosted_mfcc_from_byte_queue
 from speech.project3 import DEMO_TEMPLATE_INDEXES
 from speech.project3.hmm import HMM
 
@@ -27,11 +29,17 @@ def main() -> None:
         type=int,
         help="Number of gaussians for each state.",
     )
+    parser.add_argument(
+        "-p", "--port", type=int, help="Serve audio streams on this port instead."
+    )
     args = parser.parse_args()
 
-    byte_queue: Queue[bytes | None] = Queue()
-    audio_thread = Thread(target=audio_recording_thread, args=(byte_queue, args.output))
-    audio_thread.start()
+    if args.port is None:
+        byte_queue: Queue[bytes | None] = Queue()
+        audio_thread = Thread(
+            target=audio_recording_thread, args=(byte_queue, args.output)
+        )
+        audio_thread.start()
 
     template_files = [
         [f"recordings/{number}{i}.wav" for i in DEMO_TEMPLATE_INDEXES]
@@ -41,13 +49,15 @@ def main() -> None:
         template_files, list(range(11)), n_gaussians=args.n_gaussians
     )
 
-    full_input = np.array([], dtype=np.int16)
-    while (data := byte_queue.get()) is not None:
-        full_input = np.append(full_input, np.frombuffer(data, dtype=np.int16))
-    input_mfcc = derive_cepstrum_velocities(mfcc_homebrew(full_input)[0])
+    def recognize(input_mfcc: NDArray[np.float32]) -> str:
+        prediction = hmm.predict([input_mfcc])[0]
+        return f"Recognized number to be {prediction}."
+
+    if args.port is not None:
+        serve_forever(lambda _: BoostedMFCCConsumer(recognize), port=args.port)
+        return
 
-    prediction = hmm.predict([input_mfcc])[0]
-    print(f"Recognized number to be {prediction}.")
+    print(recognize(boosted_mfcc_from_byte_queue(byte_queue)))
 
 
 main() if __name__ == "__main__" else None
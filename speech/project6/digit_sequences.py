@@ -2,9 +2,9 @@
 Run as `python3 -m speech.project6.digit_sequences`"""
 
 from os import system
-from queue import Queue
 from typing import Final
 
+from speech.project1.bounded_queue import BoundedQueue, QueuePolicy
 from speech.project1.main import audio_recording_thread
 
 SEQUENCES: Final = [
@@ -29,7 +29,8 @@ def main() -> None:
     for out_file_name in SEQUENCE_FILE_NAMES:
         while True:
             print(f"Recording {out_file_name}.")
-            audio_recording_thread(Queue(), out_file_name)
+            # Speech is only recorded to the file.
+            audio_recording_thread(BoundedQueue(1, QueuePolicy.DROP), out_file_name)
 
             system(f"open {out_file_name}")
             if input("Press Enter to record the next one.") == "":
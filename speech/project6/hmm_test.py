@@ -4,13 +4,17 @@ from functools import reduce
 import unittest
 
 import numpy as np
-from speech.project3 import boosted_mfcc_from_file
+from speech.project3 import boosted_mfcc_from_file, use_temporary_feature_cache
 from speech.project5.hmm import align_sequence_cont_train
 
 from speech.project5.phone_rand import build_digit_hmms, load_silence_hmms
 from speech.project6.trncontspch import hmm_states_from_sequence
 
 
+def setUpModule():
+    unittest.addModuleCleanup(use_temporary_feature_cache())
+
+
 class TestAudio(unittest.TestCase):
     def test_continuous_alignment(self):
         digit_hmms = build_digit_hmms()
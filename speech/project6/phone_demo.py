@@ -6,9 +6,11 @@ from queue import Queue
 from threading import Thread
 
 import numpy as np
+from numpy.typing import NDArray
 
+from speech.project1.capture_server import serve_forever
 from speech.project1.main import audio_recording_thread
-from speech.project2.lib import derive_cepstrum_velocities, mfcc_homebrew
+from speech.project2.streaming import BoostedMFCCConsumer, boosted_mfcc_from_byte_queue
 from speech.project5.hmm import match_sequence_against_hmm_states
 from speech.project5.phone_rand import build_hmm_graph, load_silence_hmms
 from speech.project6.trncontspch import train_digit_sequences
@@ -19,6 +21,9 @@ def main() -> None:
     parser.add_argument(
         "-o", "--output", help="Output file directory", default="output.wav"
     )
+    parser.add_argument(
+        "-p", "--port", type=int, help="Serve audio streams on this port instead."
+    )
     args = parser.parse_args()
 
     digit_hmm_dict = train_digit_sequences()
@@ -28,19 +33,22 @@ def main() -> None:
         digit_hmms, silence_single_hmm
     )
 
+    def recognize(input_mfcc: NDArray[np.float32]) -> str:
+        recognition_list = match_sequence_against_hmm_states(
+            input_mfcc, non_emitting_states, emitting_states, beam_width=4000.0
+        )
+        recognition = "".join(map(str, recognition_list))
+        return f"Recognized as `{recognition}`."
+
+    if args.port is not None:
+        serve_forever(lambda _: BoostedMFCCConsumer(recognize), port=args.port)
+        return
+
     byte_queue: Queue[bytes | None] = Queue()
     audio_thread = Thread(target=audio_recording_thread, args=(byte_queue, args.output))
     audio_thread.start()
 
-    full_input = np.array([], dtype=np.int16)
-    while (data := byte_queue.get()) is not None:
-        full_input = np.append(full_input, np.frombuffer(data, dtype=np.int16))
-    input_mfcc = derive_cepstrum_velocities(mfcc_homebrew(full_input)[0])
-    recognition_list = match_sequence_against_hmm_states(
-        input_mfcc, non_emitting_states, emitting_states, beam_width=4000.0
-    )
-    recognition = "".join(map(str, recognition_list))
-    print(f"Recognized as `{recognition}`.")
+    print(recognize(boosted_mfcc_from_byte_queue(byte_queue)))
 
 
 main() if __name__ == "__main__" else None
@@ -5,10 +5,8 @@ import argparse
 from queue import Queue
 from threading import Thread
 
-import numpy as np
-
 from speech.project1.main import audio_recording_thread
-from speech.project2.lib import derive_cepstrum_velocities, mfcc_homebrew
+from speech.project2.streaming import boosted_mfcc_from_byte_queue
 from speech.project5.hmm import match_sequence_against_hmm_states
 from speech.project5.unrestricted_hmm import build_hmm_graph
 from speech.project6.trncontspch import train_digit_sequences
@@ -33,10 +31,7 @@ def main() -> None:
     audio_thread = Thread(target=audio_recording_thread, args=(byte_queue, args.output))
     audio_thread.start()
 
-    full_input = np.array([], dtype=np.int16)
-    while (data := byte_queue.get()) is not None:
-        full_input = np.append(full_input, np.frombuffer(data, dtype=np.int16))
-    input_mfcc = derive_cepstrum_velocities(mfcc_homebrew(full_input)[0])
+    input_mfcc = boosted_mfcc_from_byte_queue(byte_queue)
     recognition_list = match_sequence_against_hmm_states(
         input_mfcc, non_emitting_states, emitting_states, beam_width=4000.0
     )